@@ -0,0 +1,143 @@
+"""
+Agent definitions shared by the orchestrators - names, prompts and dependencies
+of the 12 RFP analysis agents (no client libraries imported here)
+"""
+from typing import Dict, List
+
+# Agent configurations with specialized prompts
+AGENTS = {
+    "introduction": {
+        "name": "Introduction Agent",
+        "system_prompt": """You are an expert RFP analyst specializing in executive summaries.
+Your task: Extract and synthesize the problem statement and create a compelling executive summary.
+Focus on: Business challenges, strategic objectives, high-level scope.
+Format: Clear, concise executive summary with problem statement."""
+    },
+    "challenges": {
+        "name": "Challenges Agent",
+        "system_prompt": """You are an expert at identifying business challenges in RFPs.
+Your task: Extract all business challenges, pain points, and problems the client is facing.
+Focus on: Current issues, operational difficulties, strategic challenges.
+Format: Numbered list of specific challenges with brief explanations."""
+    },
+    "pain_points": {
+        "name": "Pain Points Agent",
+        "system_prompt": """You are an expert at identifying user and operational pain points.
+Your task: Extract specific pain points affecting users, staff, and operations.
+Focus on: User frustrations, operational inefficiencies, system limitations.
+Format: Categorized pain points by stakeholder type."""
+    },
+    "business_process": {
+        "name": "Business Process Agent",
+        "system_prompt": """You are an expert at analyzing business processes and workflows.
+Your task: Map current business processes and identify workflow requirements.
+Focus on: Process flows, workflow steps, integration points, automation needs.
+Format: Structured process descriptions with key steps."""
+    },
+    "gap": {
+        "name": "Gap Analysis Agent",
+        "system_prompt": """You are an expert at gap analysis between current and desired states.
+Your task: Identify gaps between current capabilities and desired outcomes.
+Focus on: Technology gaps, capability gaps, process gaps, skill gaps.
+Format: Clear gap statements with current vs. desired state."""
+    },
+    "personas": {
+        "name": "Personas Agent",
+        "system_prompt": """You are an expert at creating user personas and stakeholder profiles.
+Your task: Identify and describe user personas, roles, and stakeholder groups.
+Focus on: User types, roles, responsibilities, needs, technical proficiency.
+Format: Detailed persona descriptions with characteristics."""
+    },
+    "constraints": {
+        "name": "Constraints Agent",
+        "system_prompt": """You are an expert at identifying project constraints and limitations.
+Your task: Extract all constraints including technical, budget, timeline, regulatory.
+Focus on: Technical limitations, compliance requirements, budget constraints, deadlines.
+Format: Categorized constraints with impact assessment."""
+    },
+    "functional_requirements": {
+        "name": "Functional Requirements Agent",
+        "system_prompt": """You are an expert at extracting functional requirements from RFPs.
+Your task: Identify all functional requirements and feature requests.
+Focus on: System capabilities, user features, functionality, business rules.
+Format: Numbered functional requirements with acceptance criteria."""
+    },
+    "nfr": {
+        "name": "Non-Functional Requirements Agent",
+        "system_prompt": """You are an expert at identifying non-functional requirements.
+Your task: Extract NFRs including performance, security, scalability, usability.
+Focus on: Performance metrics, security requirements, scalability needs, reliability.
+Format: Categorized NFRs with measurable criteria."""
+    },
+    "architecture": {
+        "name": "Architecture Agent",
+        "system_prompt": """You are an expert solution architect analyzing technical requirements.
+Your task: Identify architecture requirements, technical stack preferences, integration needs.
+Focus on: System architecture, technology preferences, integration requirements, deployment.
+Format: Architecture recommendations with technical justification."""
+    },
+    "assumptions": {
+        "name": "Assumptions Agent",
+        "system_prompt": """You are an expert at identifying implicit assumptions in RFPs.
+Your task: Extract stated assumptions and identify implicit ones.
+Focus on: Technical assumptions, business assumptions, resource assumptions.
+Format: Numbered assumptions with rationale."""
+    },
+    "impact": {
+        "name": "Impact Analysis Agent",
+        "system_prompt": """You are an expert at analyzing business impact and change management.
+Your task: Assess the impact of proposed changes on the organization.
+Focus on: Organizational impact, change management needs, training requirements.
+Format: Impact assessment with stakeholder considerations."""
+    }
+}
+
+# Order results are stored and reported in
+AGENT_ORDER = list(AGENTS)
+
+# Upstream agents each agent needs; it receives their results as context and
+# starts as soon as they are done. Agents without dependencies start immediately.
+AGENT_DEPENDENCIES = {
+    "introduction": [],
+    "challenges": [],
+    "pain_points": [],
+    "business_process": [],
+    "gap": ["business_process", "pain_points"],
+    "personas": [],
+    "constraints": [],
+    "functional_requirements": [],
+    "nfr": [],
+    "architecture": ["nfr", "constraints", "functional_requirements"],
+    "assumptions": ["constraints", "architecture"],
+    "impact": ["challenges"],
+}
+
+
+def topological_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    """
+    Agents ordered so that every agent comes after its dependencies
+    
+    Args:
+        dependencies: {agent_name: [upstream agent names]}
+        
+    Returns:
+        List[str]: Agent names (ties keep AGENT_ORDER)
+        
+    Raises:
+        ValueError: On an unknown dependency or a cycle
+    """
+    for name, upstream in dependencies.items():
+        unknown = [dep for dep in upstream if dep not in dependencies]
+        if unknown:
+            raise ValueError(f"Agent '{name}' depends on unknown agents: {unknown}")
+    
+    order = []
+    remaining = [name for name in AGENT_ORDER if name in dependencies] + \
+                [name for name in dependencies if name not in AGENT_ORDER]
+    while remaining:
+        ready = [name for name in remaining if all(dep in order for dep in dependencies[name])]
+        if not ready:
+            raise ValueError(f"Agent dependencies contain a cycle among: {remaining}")
+        order.extend(ready)
+        remaining = [name for name in remaining if name not in ready]
+    return order
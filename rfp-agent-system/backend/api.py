@@ -8,11 +8,18 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import os
 import tempfile
+import threading
 from pathlib import Path
 from pipeline import process_rfp_document
+from storage_clients import (
+    close_async_blob_service_client, ensure_container_async, forget_container, get_async_blob_service_client
+)
 
 app = FastAPI(title="RFP Process Enhancer API")
 
+# Uploads are copied to a temporary file this many bytes at a time
+UPLOAD_SPOOL_CHUNK = 1024 * 1024
+
 # Enable CORS for React frontend
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +29,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def prewarm_embedding_model():
+    """Optionally load the embedding model in the background so the first upload does not pay for it"""
+    import config
+    if config.PREWARM_EMBEDDING_MODEL:
+        from embedding.model_provider import prewarm
+        threading.Thread(target=prewarm, daemon=True).start()
+
+@app.on_event("shutdown")
+async def close_storage_clients():
+    """Close the pooled storage connections"""
+    await close_async_blob_service_client()
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -43,14 +63,25 @@ async def process_document(file: UploadFile = File(...), use_blob_storage: bool
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are accepted")
     
-    content = await file.read()
     blob_name = None
     tmp_path = None
+    ingestion = None
     
     try:
+        # Spool the upload to disk in fixed-size pieces instead of reading it into memory
+        size = 0
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+            tmp_path = tmp_file.name
+            while True:
+                piece = await file.read(UPLOAD_SPOOL_CHUNK)
+                if not piece:
+                    break
+                tmp_file.write(piece)
+                size += len(piece)
+        
         if use_blob_storage:
-            # Upload to Azure Blob Storage
-            from azure.storage.blob import BlobServiceClient
+            # Upload to Azure Blob Storage (shared aio client, so other requests keep running)
+            from azure.core.exceptions import ResourceNotFoundError
             import config
             from datetime import datetime
             
@@ -58,42 +89,35 @@ async def process_document(file: UploadFile = File(...), use_blob_storage: bool
                 try:
                     print(f"Uploading {file.filename} to Azure Blob Storage...")
                     
-                    blob_service_client = BlobServiceClient.from_connection_string(
-                        config.AZURE_STORAGE_CONNECTION_STRING
-                    )
                     container_name = "rfp-documents"
-                    
-                    # Create container if doesn't exist
-                    try:
-                        container_client = blob_service_client.get_container_client(container_name)
-                        if not container_client.exists():
-                            container_client.create_container()
-                            print(f"✓ Created container: {container_name}")
-                        else:
-                            print(f"✓ Using existing container: {container_name}")
-                    except Exception as e:
-                        print(f"Container check/create error: {e}")
-                        # Try to create anyway
-                        try:
-                            blob_service_client.create_container(container_name)
-                            print(f"✓ Created container: {container_name}")
-                        except:
-                            pass  # Already exists
+                    # Create container if doesn't exist (checked once per process)
+                    await ensure_container_async(container_name)
                     
                     # Generate unique blob name with timestamp
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                     blob_name = f"{timestamp}_{file.filename}"
                     
                     # Upload file
-                    blob_client = blob_service_client.get_blob_client(
+                    blob_client = get_async_blob_service_client().get_blob_client(
                         container=container_name,
                         blob=blob_name
                     )
-                    blob_client.upload_blob(content, overwrite=True)
-                    print(f"✓ Uploaded to blob: {blob_name}")
                     
-                    # Process from blob
-                    await process_rfp_document(blob_name=blob_name)
+                    async def upload():
+                        # Streamed from the spooled file in blocks, several in flight at once
+                        with open(tmp_path, 'rb') as data:
+                            await blob_client.upload_blob(
+                                data, length=size, overwrite=True, max_concurrency=config.BLOB_MAX_CONCURRENCY
+                            )
+                    
+                    try:
+                        await upload()
+                    except ResourceNotFoundError:
+                        # Container was deleted since it was cached as existing
+                        forget_container(container_name)
+                        await ensure_container_async(container_name)
+                        await upload()
+                    print(f"✓ Uploaded to blob: {blob_name} ({size:,} bytes)")
                     
                 except Exception as blob_error:
                     print(f"⚠ Blob storage error: {blob_error}")
@@ -103,21 +127,17 @@ async def process_document(file: UploadFile = File(...), use_blob_storage: bool
                 print("⚠ Blob storage not configured, falling back to local processing")
                 use_blob_storage = False
         
-        if not use_blob_storage:
-            # Create temporary file for local processing
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                tmp_file.write(content)
-                tmp_path = tmp_file.name
-            
-            # Process the document through the pipeline
-            print(f"Processing document: {file.filename}")
-            import traceback
-            try:
-                await process_rfp_document(file_path=tmp_path)
-            except Exception as pipeline_error:
-                print(f"Pipeline error: {str(pipeline_error)}")
-                print(traceback.format_exc())
-                raise
+        # Process the spooled copy; the blob (if any) is the same bytes, so it is not downloaded again
+        print(f"Processing document: {file.filename}")
+        import traceback
+        try:
+            _, ingestion = await process_rfp_document(
+                file_path=tmp_path, document_name=file.filename, return_stages=True
+            )
+        except Exception as pipeline_error:
+            print(f"Pipeline error: {str(pipeline_error)}")
+            print(traceback.format_exc())
+            raise
         
         # Read the generated knowledge base
         kb_path = Path(__file__).parent / "kb.md"
@@ -134,7 +154,8 @@ async def process_document(file: UploadFile = File(...), use_blob_storage: bool
             "filename": file.filename,
             "blob_name": blob_name if use_blob_storage else None,
             "storage_location": "Azure Blob Storage" if use_blob_storage else "Local",
-            "output": kb_content
+            "output": kb_content,
+            "ingestion": ingestion
         })
         
     except Exception as e:
@@ -144,7 +165,7 @@ async def process_document(file: UploadFile = File(...), use_blob_storage: bool
         raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
     
     finally:
-        # Clean up temporary file (only if using local processing)
+        # Clean up the spooled upload
         if tmp_path and os.path.exists(tmp_path):
             os.remove(tmp_path)
 
@@ -178,7 +199,6 @@ async def list_documents():
         JSON with list of stored documents
     """
     try:
-        from azure.storage.blob import BlobServiceClient
         import config
         
         if not config.AZURE_STORAGE_CONNECTION_STRING:
@@ -188,13 +208,9 @@ async def list_documents():
                 "documents": []
             })
         
-        blob_service_client = BlobServiceClient.from_connection_string(
-            config.AZURE_STORAGE_CONNECTION_STRING
-        )
-        container_client = blob_service_client.get_container_client("rfp-documents")
-        
         documents = []
-        for blob in container_client.list_blobs():
+        container_client = get_async_blob_service_client().get_container_client("rfp-documents")
+        async for blob in container_client.list_blobs():
             documents.append({
                 "name": blob.name,
                 "size": blob.size,
@@ -226,21 +242,16 @@ async def delete_document(blob_name: str):
         blob_name: Name of the blob to delete
     """
     try:
-        from azure.storage.blob import BlobServiceClient
         import config
         
         if not config.AZURE_STORAGE_CONNECTION_STRING:
             raise HTTPException(status_code=400, detail="Blob storage not configured")
         
-        blob_service_client = BlobServiceClient.from_connection_string(
-            config.AZURE_STORAGE_CONNECTION_STRING
-        )
-        blob_client = blob_service_client.get_blob_client(
+        blob_client = get_async_blob_service_client().get_blob_client(
             container="rfp-documents",
             blob=blob_name
         )
-        
-        blob_client.delete_blob()
+        await blob_client.delete_blob()
         
         return JSONResponse(content={
             "success": True,
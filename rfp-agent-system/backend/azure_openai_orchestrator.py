@@ -2,13 +2,19 @@
 Azure OpenAI Orchestrator - Runs all 12 agents using Azure OpenAI directly
 Replaces Container Apps with direct Azure OpenAI calls
 """
+import asyncio
 import os
-from typing import Dict
-from openai import AzureOpenAI
+import time
+from typing import Dict, List
+from openai import AsyncAzureOpenAI, AzureOpenAI
 from dotenv import load_dotenv
+from agent_definitions import AGENT_DEPENDENCIES, AGENTS, topological_order
 
 load_dotenv()
 
+# Characters of each upstream result passed on as context (AsyncAzureOpenAIOrchestrator)
+CONTEXT_CHARS = 500
+
 
 class AzureOpenAIOrchestrator:
     """Orchestrates all 12 RFP agents using Azure OpenAI"""
@@ -21,94 +27,7 @@ class AzureOpenAIOrchestrator:
             azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
         )
         self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_GPT4", "gpt-4o")
-        
-        # Agent configurations with specialized prompts
-        self.agents = {
-            "introduction": {
-                "name": "Introduction Agent",
-                "system_prompt": """You are an expert RFP analyst specializing in executive summaries.
-Your task: Extract and synthesize the problem statement and create a compelling executive summary.
-Focus on: Business challenges, strategic objectives, high-level scope.
-Format: Clear, concise executive summary with problem statement."""
-            },
-            "challenges": {
-                "name": "Challenges Agent",
-                "system_prompt": """You are an expert at identifying business challenges in RFPs.
-Your task: Extract all business challenges, pain points, and problems the client is facing.
-Focus on: Current issues, operational difficulties, strategic challenges.
-Format: Numbered list of specific challenges with brief explanations."""
-            },
-            "pain_points": {
-                "name": "Pain Points Agent",
-                "system_prompt": """You are an expert at identifying user and operational pain points.
-Your task: Extract specific pain points affecting users, staff, and operations.
-Focus on: User frustrations, operational inefficiencies, system limitations.
-Format: Categorized pain points by stakeholder type."""
-            },
-            "business_process": {
-                "name": "Business Process Agent",
-                "system_prompt": """You are an expert at analyzing business processes and workflows.
-Your task: Map current business processes and identify workflow requirements.
-Focus on: Process flows, workflow steps, integration points, automation needs.
-Format: Structured process descriptions with key steps."""
-            },
-            "gap": {
-                "name": "Gap Analysis Agent",
-                "system_prompt": """You are an expert at gap analysis between current and desired states.
-Your task: Identify gaps between current capabilities and desired outcomes.
-Focus on: Technology gaps, capability gaps, process gaps, skill gaps.
-Format: Clear gap statements with current vs. desired state."""
-            },
-            "personas": {
-                "name": "Personas Agent",
-                "system_prompt": """You are an expert at creating user personas and stakeholder profiles.
-Your task: Identify and describe user personas, roles, and stakeholder groups.
-Focus on: User types, roles, responsibilities, needs, technical proficiency.
-Format: Detailed persona descriptions with characteristics."""
-            },
-            "constraints": {
-                "name": "Constraints Agent",
-                "system_prompt": """You are an expert at identifying project constraints and limitations.
-Your task: Extract all constraints including technical, budget, timeline, regulatory.
-Focus on: Technical limitations, compliance requirements, budget constraints, deadlines.
-Format: Categorized constraints with impact assessment."""
-            },
-            "functional_requirements": {
-                "name": "Functional Requirements Agent",
-                "system_prompt": """You are an expert at extracting functional requirements from RFPs.
-Your task: Identify all functional requirements and feature requests.
-Focus on: System capabilities, user features, functionality, business rules.
-Format: Numbered functional requirements with acceptance criteria."""
-            },
-            "nfr": {
-                "name": "Non-Functional Requirements Agent",
-                "system_prompt": """You are an expert at identifying non-functional requirements.
-Your task: Extract NFRs including performance, security, scalability, usability.
-Focus on: Performance metrics, security requirements, scalability needs, reliability.
-Format: Categorized NFRs with measurable criteria."""
-            },
-            "architecture": {
-                "name": "Architecture Agent",
-                "system_prompt": """You are an expert solution architect analyzing technical requirements.
-Your task: Identify architecture requirements, technical stack preferences, integration needs.
-Focus on: System architecture, technology preferences, integration requirements, deployment.
-Format: Architecture recommendations with technical justification."""
-            },
-            "assumptions": {
-                "name": "Assumptions Agent",
-                "system_prompt": """You are an expert at identifying implicit assumptions in RFPs.
-Your task: Extract stated assumptions and identify implicit ones.
-Focus on: Technical assumptions, business assumptions, resource assumptions.
-Format: Numbered assumptions with rationale."""
-            },
-            "impact": {
-                "name": "Impact Analysis Agent",
-                "system_prompt": """You are an expert at analyzing business impact and change management.
-Your task: Assess the impact of proposed changes on the organization.
-Focus on: Organizational impact, change management needs, training requirements.
-Format: Impact assessment with stakeholder considerations."""
-            }
-        }
+        self.agents = AGENTS
     
     def analyze_with_agent(self, agent_type: str, rfp_text: str, context: Dict = None) -> Dict:
         """
@@ -198,3 +117,164 @@ Format: Impact assessment with stakeholder considerations."""
                 context[agent_type] = result["result"][:500]  # Keep context manageable
         
         return results
+
+
+class AsyncAzureOpenAIOrchestrator:
+    """
+    Runs the same 12 agents on AsyncAzureOpenAI, concurrently
+    
+    Each agent is called as soon as the agents it depends on (AGENT_DEPENDENCIES)
+    have finished, with at most max_concurrency calls in flight and a timeout
+    per call. An agent receives only its upstream results as context, not
+    everything produced before it. Results have the same shape as
+    AzureOpenAIOrchestrator.run_all_agents.
+    """
+    
+    def __init__(self, max_concurrency: int = None, agent_timeout: float = None):
+        """
+        Args:
+            max_concurrency: Agent calls in flight at once (default: AGENT_CONCURRENCY, 12)
+            agent_timeout: Seconds before an agent call is abandoned (default: AGENT_TIMEOUT_SECONDS, 120)
+        """
+        self.deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT_GPT4", "gpt-4o")
+        self.agents = AGENTS
+        self.max_concurrency = max_concurrency or int(os.getenv("AGENT_CONCURRENCY", "12"))
+        self.agent_timeout = agent_timeout or float(os.getenv("AGENT_TIMEOUT_SECONDS", "120"))
+    
+    def _async_client(self) -> AsyncAzureOpenAI:
+        return AsyncAzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_KEY"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
+        )
+    
+    async def analyze_with_agent_async(self, agent_type: str, rfp_text: str, context: Dict = None,
+                                       client: AsyncAzureOpenAI = None) -> Dict:
+        """
+        Async version of analyze_with_agent, bounded by agent_timeout
+        
+        Args:
+            agent_type: Type of agent (introduction, challenges, etc.)
+            rfp_text: The RFP text to analyze
+            context: Optional {agent_type: result} of upstream agents
+            client: AsyncAzureOpenAI client to use (default: a client for this call)
+            
+        Returns:
+            Dict with analysis result
+        """
+        if agent_type not in self.agents:
+            return {"error": f"Unknown agent type: {agent_type}", "result": ""}
+        
+        agent_config = self.agents[agent_type]
+        own_client = client is None
+        client = client or self._async_client()
+        
+        try:
+            user_message = f"RFP Document:\n\n{rfp_text}"
+            if context:
+                user_message += "\n\nContext from previous analysis:"
+                for upstream, result in context.items():
+                    user_message += f"\n\n[{self.agents[upstream]['name']}]\n{result[:CONTEXT_CHARS]}"
+            
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=self.deployment,
+                    messages=[
+                        {"role": "system", "content": agent_config["system_prompt"]},
+                        {"role": "user", "content": user_message}
+                    ],
+                    temperature=0.7,
+                    max_tokens=2000
+                ),
+                timeout=self.agent_timeout
+            )
+            
+            return {
+                "agent": agent_config["name"],
+                "result": response.choices[0].message.content,
+                "status": "success"
+            }
+            
+        except asyncio.TimeoutError:
+            return {
+                "agent": agent_config["name"],
+                "error": f"Timed out after {self.agent_timeout:.0f}s",
+                "result": "",
+                "status": "error"
+            }
+        except Exception as e:
+            return {
+                "agent": agent_config["name"],
+                "error": str(e),
+                "result": "",
+                "status": "error"
+            }
+        finally:
+            if own_client:
+                await client.close()
+    
+    async def run_all_agents_async(self, rfp_text: str, dependencies: Dict[str, List[str]] = None,
+                                   timings: Dict = None) -> Dict[str, Dict]:
+        """
+        Run all 12 agents concurrently along their dependencies
+        
+        Args:
+            rfp_text: The RFP document text
+            dependencies: {agent_type: [upstream agent types]} (default: AGENT_DEPENDENCIES)
+            timings: Optional dict filled with {agent_type: seconds}
+            
+        Returns:
+            Dict mapping agent type to result (in the fixed agent order)
+            
+        Raises:
+            ValueError: On an unknown agent or dependency, or a dependency cycle
+        """
+        dependencies = dependencies or AGENT_DEPENDENCIES
+        unknown = [agent_type for agent_type in dependencies if agent_type not in self.agents]
+        if unknown:
+            raise ValueError(f"Dependencies name unknown agents: {unknown}")
+        dependencies = {agent_type: dependencies.get(agent_type, []) for agent_type in self.agents}
+        order = topological_order(dependencies)
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        client = self._async_client()
+        tasks = {}
+        durations = {}
+        
+        async def run_agent(agent_type):
+            upstream = dependencies[agent_type]
+            upstream_results = await asyncio.gather(*(tasks[dep] for dep in upstream))
+            # Only successful upstream results are passed on
+            context = {
+                dep: result["result"] for dep, result in zip(upstream, upstream_results)
+                if result.get("status") == "success"
+            }
+            async with semaphore:
+                print(f"  • Running {agent_type} agent...")
+                start = time.perf_counter()
+                result = await self.analyze_with_agent_async(agent_type, rfp_text, context, client)
+                durations[agent_type] = time.perf_counter() - start
+            return result
+        
+        start = time.perf_counter()
+        try:
+            # Every task exists before any of them runs, so dependents can await their upstream tasks
+            for agent_type in order:
+                tasks[agent_type] = asyncio.ensure_future(run_agent(agent_type))
+            await asyncio.gather(*tasks.values())
+        finally:
+            await client.close()
+        wall = time.perf_counter() - start
+        
+        if timings is not None:
+            timings.update(durations)
+        print(f"✓ {len(tasks)} agents in {wall:.1f}s with up to {self.max_concurrency} concurrent "
+              f"(sum of calls {sum(durations.values()):.1f}s)")
+        return {agent_type: tasks[agent_type].result() for agent_type in self.agents}
+    
+    def run_all_agents(self, rfp_text: str) -> Dict[str, Dict]:
+        """
+        Synchronous entry point with the same signature as AzureOpenAIOrchestrator.run_all_agents
+        (must not be called from a running event loop; await run_all_agents_async there)
+        """
+        return asyncio.run(self.run_all_agents_async(rfp_text))
@@ -1,8 +1,23 @@
-# Download files from Azure Blob Storage (works with private containers)
-from azure.storage.blob import BlobServiceClient
+# Download, upload and bulk-sync files with Azure Blob Storage (works with private containers)
 import config
+from storage_clients import ensure_container, get_async_blob_service_client, get_blob_service_client
+import hashlib
+import json
 import sys
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Well-known development account of the Azurite storage emulator (docker run -p 10000:10000 mcr.microsoft.com/azure-storage/azurite)
+AZURITE_CONN_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "BlobEndpoint=http://127.0.0.1:10000/devstoreaccount1;"
+)
+
+# Local record of downloaded blob ETags (for blobs stored without an MD5)
+SYNC_STATE_FILE = ".blobsync.json"
 
 def download_blob(blob_name: str, local_path: str = None):
     """
@@ -14,8 +29,8 @@ def download_blob(blob_name: str, local_path: str = None):
         local_path: Local path to save file (optional, defaults to same name)
     """
     try:
-        # Create BlobServiceClient using connection string (works with private access)
-        blob_service_client = BlobServiceClient.from_connection_string(config.BLOB_CONN_STRING)
+        # Shared BlobServiceClient using connection string (works with private access)
+        blob_service_client = get_blob_service_client()
         
         # Get container and blob clients
         container_client = blob_service_client.get_container_client(config.BLOB_CONTAINER_NAME)
@@ -30,10 +45,10 @@ def download_blob(blob_name: str, local_path: str = None):
         
         print(f"Downloading '{blob_name}' from Azure Blob Storage...")
         
-        # Download blob
+        # Download blob in parallel ranges straight to disk (memory bounded by chunk size x concurrency)
         with open(local_path, "wb") as f:
-            download_stream = blob_client.download_blob()
-            f.write(download_stream.readall())
+            download_stream = blob_client.download_blob(max_concurrency=config.BLOB_MAX_CONCURRENCY)
+            download_stream.readinto(f)
         
         file_size = os.path.getsize(local_path)
         print(f"✓ Downloaded successfully!")
@@ -52,8 +67,7 @@ def list_blobs():
     List all blobs in the container
     """
     try:
-        blob_service_client = BlobServiceClient.from_connection_string(config.BLOB_CONN_STRING)
-        container_client = blob_service_client.get_container_client(config.BLOB_CONTAINER_NAME)
+        container_client = get_blob_service_client().get_container_client(config.BLOB_CONTAINER_NAME)
         
         print(f"\nBlobs in container '{config.BLOB_CONTAINER_NAME}':")
         print("-" * 60)
@@ -94,14 +108,14 @@ def upload_blob(local_file_path: str, blob_name: str = None):
         if not blob_name:
             blob_name = os.path.basename(local_file_path)
         
-        blob_service_client = BlobServiceClient.from_connection_string(config.BLOB_CONN_STRING)
-        container_client = blob_service_client.get_container_client(config.BLOB_CONTAINER_NAME)
+        container_client = get_blob_service_client().get_container_client(config.BLOB_CONTAINER_NAME)
         blob_client = container_client.get_blob_client(blob_name)
         
         print(f"Uploading '{local_file_path}' to Azure Blob Storage...")
         
+        # Streamed from disk in blocks, several in flight at once
         with open(local_file_path, "rb") as f:
-            blob_client.upload_blob(f, overwrite=True)
+            blob_client.upload_blob(f, overwrite=True, max_concurrency=config.BLOB_MAX_CONCURRENCY)
         
         print(f"✓ Uploaded successfully!")
         print(f"  Blob name: {blob_name}")
@@ -114,17 +128,306 @@ def upload_blob(local_file_path: str, blob_name: str = None):
         return False
 
 
+async def download_blob_async(blob_name: str, local_path: str = None):
+    """
+    Async version of download_blob (aio client; parallel ranges are written straight to disk)
+    
+    Args:
+        blob_name: Name of the blob in Azure Storage
+        local_path: Local path to save file (optional, defaults to same name)
+    """
+    try:
+        if not local_path:
+            local_path = os.path.join("data", "raw_text", blob_name)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        
+        print(f"Downloading '{blob_name}' from Azure Blob Storage...")
+        
+        blob_client = get_async_blob_service_client().get_blob_client(config.BLOB_CONTAINER_NAME, blob_name)
+        download_stream = await blob_client.download_blob(max_concurrency=config.BLOB_MAX_CONCURRENCY)
+        with open(local_path, "wb") as f:
+            await download_stream.readinto(f)
+        
+        print(f"✓ Downloaded '{blob_name}' ({os.path.getsize(local_path):,} bytes) to {local_path}")
+        return local_path
+        
+    except Exception as e:
+        print(f"✗ Error downloading blob: {e}")
+        return None
+
+
+async def list_blobs_async():
+    """
+    Async version of list_blobs; returns the blob names without printing them
+    """
+    try:
+        container_client = get_async_blob_service_client().get_container_client(config.BLOB_CONTAINER_NAME)
+        return [blob.name async for blob in container_client.list_blobs()]
+        
+    except Exception as e:
+        print(f"✗ Error listing blobs: {e}")
+        return []
+
+
+async def upload_blob_async(local_file_path: str, blob_name: str = None):
+    """
+    Async version of upload_blob
+    
+    Args:
+        local_file_path: Path to local file
+        blob_name: Name for blob (optional, defaults to filename)
+    """
+    try:
+        if not os.path.exists(local_file_path):
+            print(f"✗ File not found: {local_file_path}")
+            return False
+        
+        if not blob_name:
+            blob_name = os.path.basename(local_file_path)
+        
+        print(f"Uploading '{local_file_path}' to Azure Blob Storage...")
+        
+        blob_client = get_async_blob_service_client().get_blob_client(config.BLOB_CONTAINER_NAME, blob_name)
+        with open(local_file_path, "rb") as f:
+            await blob_client.upload_blob(f, overwrite=True, max_concurrency=config.BLOB_MAX_CONCURRENCY)
+        
+        print(f"✓ Uploaded '{blob_name}' to container {config.BLOB_CONTAINER_NAME}")
+        return True
+        
+    except Exception as e:
+        print(f"✗ Error uploading blob: {e}")
+        return False
+
+
+def file_md5(path: str) -> bytes:
+    """MD5 digest of a local file, read in 1 MB pieces"""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for piece in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(piece)
+    return digest.digest()
+
+
+def _remote_blobs(prefix: str) -> dict:
+    """{blob name: BlobProperties} under a prefix, from one listing"""
+    container_client = get_blob_service_client().get_container_client(config.BLOB_CONTAINER_NAME)
+    return {blob.name: blob for blob in container_client.list_blobs(name_starts_with=prefix or None)}
+
+
+def _download_path(local_dir: str, relative_name: str):
+    """
+    Local file for a blob name (relative to the sync prefix), or None if it is unsafe
+    
+    Rejects names that resolve outside local_dir (e.g. containing "..") and
+    names with an empty last segment (directory markers such as "docs/").
+    """
+    parts = relative_name.split("/")
+    if not parts[-1]:
+        return None
+    root = os.path.realpath(local_dir)
+    path = os.path.realpath(os.path.join(root, *parts))
+    if path == root or os.path.commonpath([root, path]) != root:
+        return None
+    if path == os.path.join(root, SYNC_STATE_FILE):
+        return None
+    return path
+
+
+def _run_transfers(jobs: list, transfer, workers: int, action: str) -> dict:
+    """Run transfer(job) for every job on a thread pool; returns throughput statistics"""
+    stats = {"transferred": 0, "failed": 0, "bytes": 0}
+    lock = threading.Lock()
+    start = time.perf_counter()
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(transfer, job): job for job in jobs}
+        for future in as_completed(futures):
+            name, size = futures[future][:2]
+            try:
+                future.result()
+                with lock:
+                    stats["transferred"] += 1
+                    stats["bytes"] += size
+                print(f"  ✓ {action} {name} ({size:,} bytes)")
+            except Exception as e:
+                stats["failed"] += 1
+                print(f"  ✗ {action} {name} failed: {e}")
+    
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = elapsed
+    stats["mb_per_s"] = stats["bytes"] / (1024 * 1024) / elapsed if elapsed else 0.0
+    stats["files_per_s"] = stats["transferred"] / elapsed if elapsed else 0.0
+    return stats
+
+
+def _print_sync_stats(stats: dict) -> None:
+    print(f"\n✓ {stats['transferred']} transferred, {stats['skipped']} unchanged, {stats['failed']} failed")
+    if stats.get("rejected"):
+        print(f"⚠ {stats['rejected']} blob names rejected (outside the target directory or not a file)")
+    print(f"  {stats['bytes'] / (1024 * 1024):.1f} MB in {stats['seconds']:.1f}s "
+          f"({stats['mb_per_s']:.1f} MB/s, {stats['files_per_s']:.1f} files/s)")
+
+
+def sync_upload(local_dir: str, prefix: str = "", workers: int = 8, dry_run: bool = False) -> dict:
+    """
+    Upload every file under a directory, skipping blobs that are already identical
+    
+    A file is skipped when a blob of the same name has the same size and MD5.
+    Uploaded blobs get their MD5 stored (Content-MD5), so later syncs can compare
+    without downloading anything.
+    
+    Args:
+        local_dir: Directory to upload (recursively)
+        prefix: Blob name prefix, e.g. "archive/2023/"
+        workers: Files uploaded in parallel
+        dry_run: Only report what would be uploaded
+    
+    Returns:
+        dict: transferred/skipped/failed counts, bytes, seconds, MB/s and files/s
+    """
+    from azure.storage.blob import ContentSettings
+    
+    ensure_container()
+    remote = _remote_blobs(prefix)
+    
+    jobs = []
+    skipped = 0
+    for root, _, files in os.walk(local_dir):
+        for filename in files:
+            path = os.path.join(root, filename)
+            if filename == SYNC_STATE_FILE:
+                continue
+            blob_name = prefix + os.path.relpath(path, local_dir).replace(os.sep, "/")
+            size = os.path.getsize(path)
+            blob = remote.get(blob_name)
+            # Hash only when the size already matches
+            md5 = None
+            if blob is not None and blob.size == size:
+                md5 = file_md5(path)
+                remote_md5 = blob.content_settings.content_md5
+                if remote_md5 and bytes(remote_md5) == md5:
+                    skipped += 1
+                    continue
+            jobs.append((blob_name, size, path, md5))
+    
+    print(f"Uploading {len(jobs)} files to '{config.BLOB_CONTAINER_NAME}' ({skipped} unchanged, {workers} workers)...")
+    if dry_run:
+        for blob_name, size, _, _ in jobs:
+            print(f"  would upload {blob_name} ({size:,} bytes)")
+        return {"transferred": 0, "skipped": skipped, "failed": 0, "bytes": 0,
+                "seconds": 0.0, "mb_per_s": 0.0, "files_per_s": 0.0, "pending": len(jobs)}
+    
+    container_client = get_blob_service_client().get_container_client(config.BLOB_CONTAINER_NAME)
+    
+    def upload(job):
+        blob_name, size, path, md5 = job
+        md5 = md5 or file_md5(path)
+        with open(path, "rb") as f:
+            container_client.get_blob_client(blob_name).upload_blob(
+                f, length=size, overwrite=True, content_settings=ContentSettings(content_md5=bytearray(md5))
+            )
+    
+    stats = _run_transfers(jobs, upload, workers, "uploaded")
+    stats["skipped"] = skipped
+    _print_sync_stats(stats)
+    return stats
+
+
+def sync_download(local_dir: str, prefix: str = "", workers: int = 8, dry_run: bool = False) -> dict:
+    """
+    Download every blob under a prefix, skipping local files that are already identical
+    
+    A blob is skipped when the local file has the same size and either the
+    same MD5 or, for blobs stored without an MD5, the ETag recorded by the last
+    sync (kept in <local_dir>/.blobsync.json).
+    
+    Args:
+        local_dir: Target directory
+        prefix: Only blobs whose name starts with this
+        workers: Blobs downloaded in parallel
+        dry_run: Only report what would be downloaded
+    
+    Returns:
+        dict: transferred/skipped/failed/rejected counts, bytes, seconds, MB/s and files/s
+    """
+    from azure.core import MatchConditions
+    
+    state_path = os.path.join(local_dir, SYNC_STATE_FILE)
+    state = {}
+    if os.path.exists(state_path):
+        with open(state_path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    
+    jobs = []
+    skipped = 0
+    rejected = 0
+    for blob_name, blob in _remote_blobs(prefix).items():
+        path = _download_path(local_dir, blob_name[len(prefix):])
+        if path is None:
+            rejected += 1
+            print(f"  ⚠ Skipping {blob_name}: not a file name inside {local_dir}")
+            continue
+        if os.path.exists(path) and os.path.getsize(path) == blob.size:
+            remote_md5 = blob.content_settings.content_md5
+            if remote_md5 and file_md5(path) == bytes(remote_md5):
+                skipped += 1
+                continue
+            if not remote_md5 and state.get(blob_name) == blob.etag:
+                skipped += 1
+                continue
+        jobs.append((blob_name, blob.size, path, blob.etag))
+    
+    print(f"Downloading {len(jobs)} blobs from '{config.BLOB_CONTAINER_NAME}' ({skipped} unchanged, {workers} workers)...")
+    if dry_run:
+        for blob_name, size, _, _ in jobs:
+            print(f"  would download {blob_name} ({size:,} bytes)")
+        return {"transferred": 0, "skipped": skipped, "failed": 0, "rejected": rejected, "bytes": 0,
+                "seconds": 0.0, "mb_per_s": 0.0, "files_per_s": 0.0, "pending": len(jobs)}
+    
+    container_client = get_blob_service_client().get_container_client(config.BLOB_CONTAINER_NAME)
+    
+    def download(job):
+        blob_name, _, path, etag = job
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".part"
+        with open(tmp_path, "wb") as f:
+            # Pinned to the listed version, so the recorded ETag matches the bytes written
+            container_client.get_blob_client(blob_name).download_blob(
+                etag=etag, match_condition=MatchConditions.IfNotModified
+            ).readinto(f)
+        os.replace(tmp_path, path)
+        state[blob_name] = etag
+    
+    stats = _run_transfers(jobs, download, workers, "downloaded")
+    stats["skipped"] = skipped
+    stats["rejected"] = rejected
+    
+    os.makedirs(local_dir, exist_ok=True)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    _print_sync_stats(stats)
+    return stats
+
+
 def main():
     import argparse
     
     parser = argparse.ArgumentParser(description='Manage Azure Blob Storage files')
-    parser.add_argument('action', choices=['list', 'download', 'upload'], 
+    parser.add_argument('action', choices=['list', 'download', 'upload', 'sync-up', 'sync-down'], 
                        help='Action to perform')
     parser.add_argument('--blob', help='Blob name (for download/upload)')
     parser.add_argument('--file', help='Local file path (for download/upload)')
+    parser.add_argument('--dir', help='Local directory (for sync-up/sync-down)')
+    parser.add_argument('--prefix', default='', help='Blob name prefix (for sync-up/sync-down)')
+    parser.add_argument('--workers', type=int, default=8, help='Parallel transfers (for sync-up/sync-down)')
+    parser.add_argument('--dry-run', action='store_true', help='Only show what would be transferred')
+    parser.add_argument('--azurite', action='store_true', help='Use the local Azurite emulator')
     
     args = parser.parse_args()
     
+    if args.azurite:
+        config.BLOB_CONN_STRING = AZURITE_CONN_STRING
+    
     if args.action == 'list':
         list_blobs()
     
@@ -141,6 +444,14 @@ def main():
             print("Usage: python blob_manager.py upload --file my-file.pdf [--blob custom-name.pdf]")
             return
         upload_blob(args.file, args.blob)
+    
+    elif args.action in ('sync-up', 'sync-down'):
+        if not args.dir:
+            print(f"Error: --dir required for {args.action}")
+            print(f"Usage: python blob_manager.py {args.action} --dir ./archive [--prefix archive/] [--workers 8]")
+            return
+        sync = sync_upload if args.action == 'sync-up' else sync_download
+        sync(args.dir, args.prefix, args.workers, args.dry_run)
 
 
 if __name__ == "__main__":
@@ -153,6 +464,8 @@ if __name__ == "__main__":
         print("  python blob_manager.py download --blob my-file.pdf --file ./local-copy.pdf")
         print("  python blob_manager.py upload --file my-file.pdf")
         print("  python blob_manager.py upload --file my-file.pdf --blob custom-name.pdf")
+        print("  python blob_manager.py sync-up --dir ./archive --prefix archive/ [--workers 8] [--dry-run]")
+        print("  python blob_manager.py sync-down --dir ./archive --prefix archive/ [--workers 8] [--dry-run]")
         print("\nExamples:")
         print("  # List all files in container")
         print("  python blob_manager.py list")
@@ -162,6 +475,9 @@ if __name__ == "__main__":
         print()
         print("  # Upload a file")
         print("  python blob_manager.py upload --file ./my-rfp.pdf")
+        print()
+        print("  # Mirror a folder of past RFPs (unchanged files are skipped; add --azurite to test locally)")
+        print("  python blob_manager.py sync-up --dir ./past-rfps --prefix archive/ --workers 16")
         print("\n" + "=" * 60)
     else:
         main()
@@ -10,6 +10,18 @@ load_dotenv()
 BLOB_CONN_STRING = os.getenv("BLOB_CONN_STRING")
 AZURE_STORAGE_CONNECTION_STRING = os.getenv("BLOB_CONN_STRING")  # Alias for consistency
 BLOB_CONTAINER_NAME = os.getenv("BLOB_CONTAINER_NAME", "rfpenhancer1")
+# Blobs are transferred in ranges/blocks of this size, up to N at a time (peak buffer ~ chunk size x concurrency)
+BLOB_TRANSFER_CHUNK_MB = int(os.getenv("BLOB_TRANSFER_CHUNK_MB", "4"))
+BLOB_MAX_CONCURRENCY = int(os.getenv("BLOB_MAX_CONCURRENCY", "4"))
+# Keep-alive connections held by the shared storage client (see storage_clients.py)
+BLOB_POOL_SIZE = int(os.getenv("BLOB_POOL_SIZE", "16"))
+# Client options that keep single-shot GET/PUT requests from buffering a whole blob
+BLOB_TRANSFER_OPTIONS = {
+    "max_single_get_size": BLOB_TRANSFER_CHUNK_MB * 1024 * 1024,
+    "max_chunk_get_size": BLOB_TRANSFER_CHUNK_MB * 1024 * 1024,
+    "max_single_put_size": BLOB_TRANSFER_CHUNK_MB * 1024 * 1024,
+    "max_block_size": BLOB_TRANSFER_CHUNK_MB * 1024 * 1024,
+}
 
 # Azure Document Intelligence (for PDF text extraction)
 FORM_RECOGNIZER_ENDPOINT = os.getenv("FORM_RECOGNIZER_ENDPOINT")
@@ -29,3 +41,27 @@ USE_AZURE_OPENAI = os.getenv("USE_AZURE_OPENAI", "true").lower() == "true"
 
 # Model Selection: "gpt4" for better quality, "gpt35" for faster/cheaper
 AZURE_OPENAI_MODEL = os.getenv("AZURE_OPENAI_MODEL", "gpt4")
+
+# Load the embedding model at API startup (in the background) instead of on first use
+PREWARM_EMBEDDING_MODEL = os.getenv("PREWARM_EMBEDDING_MODEL", "false").lower() == "true"
+
+# Embedding cache (content-addressed, shared by all embedding entry points)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/cache/embeddings.sqlite")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+
+# Document Intelligence extraction cache (SQLite, keyed by SHA-256 of model id + document bytes)
+EXTRACTION_CACHE_ENABLED = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+EXTRACTION_CACHE_PATH = os.getenv("EXTRACTION_CACHE_PATH", "data/cache/extractions.sqlite")
+EXTRACTION_CACHE_MAX_MB = int(os.getenv("EXTRACTION_CACHE_MAX_MB", "512"))
+# Serve extraction only from the cache (offline replay/benchmarking); misses raise instead of calling the service
+EXTRACTION_OFFLINE = os.getenv("EXTRACTION_OFFLINE", "false").lower() == "true"
+
+# PDF text extraction: "remote" (Document Intelligence) or "local" (embedded text layer; scanned pages go to OCR)
+PDF_EXTRACTION_BACKEND = os.getenv("PDF_EXTRACTION_BACKEND", "remote").lower()
+# Worker processes for local extraction (0 = CPU count)
+LOCAL_PDF_WORKERS = int(os.getenv("LOCAL_PDF_WORKERS", "0"))
+
+# Large PDFs are analyzed as several page-range jobs (0 = always one job), run concurrently up to the cap
+EXTRACTION_PAGES_PER_JOB = int(os.getenv("EXTRACTION_PAGES_PER_JOB", "50"))
+EXTRACTION_MAX_CONCURRENCY = int(os.getenv("EXTRACTION_MAX_CONCURRENCY", "4"))
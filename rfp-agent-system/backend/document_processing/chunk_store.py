@@ -0,0 +1,129 @@
+# Packed, append-only chunk storage (one file per document)
+import mmap
+import os
+import re
+import threading
+from typing import Iterator, List, NamedTuple
+
+import numpy as np
+
+# Per-document write locks shared by every PackedChunkStore in the process, so two
+# requests appending to the same pack cannot compute offsets from the same file size
+_doc_locks = {}
+_doc_locks_guard = threading.Lock()
+
+
+class ChunkRef(NamedTuple):
+    """Location of one chunk inside a document's pack file"""
+    doc_id: str
+    offset: int
+    length: int
+
+
+class PackedChunkStore:
+    """
+    Stores every chunk of a document in a single append-only file
+    
+    Layout (chunks_dir):
+        <doc_id>.pack - UTF-8 chunk texts, back to back
+        <doc_id>.idx  - uint64 (offset, length) pairs, one per chunk, in write order
+    
+    Chunks are read back through a shared read-only mmap, so a ChunkRef can
+    stand in for the chunk text (e.g. in the vector store). Files are only ever
+    appended to, so existing ChunkRefs stay valid when a document is re-written.
+    """
+    
+    def __init__(self, chunks_dir: str = "data/chunks"):
+        self.chunks_dir = chunks_dir
+        os.makedirs(chunks_dir, exist_ok=True)
+        self._maps = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_doc_id(name: str) -> str:
+        """File-system safe document id derived from a filename or blob name"""
+        return re.sub(r"[^A-Za-z0-9._-]", "_", name) or "unknown"
+    
+    def pack_path(self, doc_id: str) -> str:
+        return os.path.join(self.chunks_dir, f"{doc_id}.pack")
+    
+    def index_path(self, doc_id: str) -> str:
+        return os.path.join(self.chunks_dir, f"{doc_id}.idx")
+    
+    def append_chunks(self, doc_id: str, chunks: List[str]) -> List[ChunkRef]:
+        """
+        Append chunks to a document's pack with one write per file
+        
+        Args:
+            doc_id: Document id (see make_doc_id)
+            chunks: Chunk texts in document order
+        
+        Returns:
+            List[ChunkRef]: One reference per chunk
+        """
+        encoded = [chunk.encode("utf-8") for chunk in chunks]
+        with self._doc_lock(doc_id):
+            pack_path = self.pack_path(doc_id)
+            start = os.path.getsize(pack_path) if os.path.exists(pack_path) else 0
+            lengths = np.array([len(data) for data in encoded], dtype=np.uint64)
+            offsets = start + np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.uint64)
+            
+            with open(pack_path, "ab") as f:
+                f.write(b"".join(encoded))
+            with open(self.index_path(doc_id), "ab") as f:
+                f.write(np.stack([offsets, lengths], axis=1).astype(np.uint64).tobytes())
+        
+        return [ChunkRef(doc_id, int(offset), int(length)) for offset, length in zip(offsets, lengths)]
+    
+    def read(self, ref: ChunkRef) -> str:
+        """Read one chunk through the document's mmap"""
+        if not ref.length:
+            return ""
+        end = ref.offset + ref.length
+        with self._lock:
+            return self._map(ref.doc_id, end)[ref.offset:end].decode("utf-8")
+    
+    def contains(self, ref: ChunkRef) -> bool:
+        """Whether the pack still holds the bytes a reference points to"""
+        path = self.pack_path(ref.doc_id)
+        return os.path.exists(path) and os.path.getsize(path) >= ref.offset + ref.length
+    
+    def refs(self, doc_id: str) -> List[ChunkRef]:
+        """References to every chunk written for a document, in write order"""
+        path = self.index_path(doc_id)
+        if not os.path.exists(path):
+            return []
+        pairs = np.fromfile(path, dtype=np.uint64).reshape(-1, 2)
+        return [ChunkRef(doc_id, int(offset), int(length)) for offset, length in pairs]
+    
+    def iter_chunks(self, doc_id: str) -> Iterator[str]:
+        """Yield every chunk of a document in write order"""
+        for ref in self.refs(doc_id):
+            yield self.read(ref)
+    
+    def delete_document(self, doc_id: str) -> None:
+        """Remove a document's pack and index"""
+        with self._doc_lock(doc_id), self._lock:
+            mapped = self._maps.pop(doc_id, None)
+            if mapped is not None:
+                mapped.close()
+            for path in (self.pack_path(doc_id), self.index_path(doc_id)):
+                if os.path.exists(path):
+                    os.remove(path)
+    
+    def _doc_lock(self, doc_id: str) -> threading.Lock:
+        """Process-wide lock for one document's pack and index files"""
+        key = os.path.abspath(self.pack_path(doc_id))
+        with _doc_locks_guard:
+            return _doc_locks.setdefault(key, threading.Lock())
+    
+    def _map(self, doc_id: str, needed: int) -> mmap.mmap:
+        """Read-only mmap of a pack, remapped once the file has grown past it (caller holds the lock)"""
+        mapped = self._maps.get(doc_id)
+        if mapped is None or len(mapped) < needed:
+            if mapped is not None:
+                mapped.close()
+            with open(self.pack_path(doc_id), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[doc_id] = mapped
+        return mapped
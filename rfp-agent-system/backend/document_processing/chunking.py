@@ -1,5 +1,8 @@
 # Document chunking for processing
-from typing import List
+import re
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from document_processing.tables import render_table
 
 
 def chunk_text(text: str, max_tokens: int = 200) -> List[str]:
@@ -139,3 +142,451 @@ def chunk_by_paragraphs(text: str, max_words: int = 700) -> List[str]:
         chunks.append("\n\n".join(current_chunk))
     
     return chunks
+
+
+def chunk_text_by_tokens(text: str, counter, max_tokens: int = None) -> List[str]:
+    """
+    Split text into word-aligned chunks of at most max_tokens real tokens
+    
+    Words are packed greedily using cached per-word counts, then each chunk is
+    checked with the full tokenizer (including special tokens) and split
+    further if word-level counts underestimated it.
+    
+    Args:
+        text: The text to chunk
+        counter: TokenCounter for the consuming model (see document_processing.tokenization)
+        max_tokens: Token limit per chunk (default: counter.max_tokens)
+        
+    Returns:
+        List[str]: List of text chunks
+    """
+    budget = max_tokens or counter.max_tokens
+    if not budget:
+        raise ValueError("max_tokens is required for a counter without a model limit")
+    
+    chunks = []
+    current = []
+    current_tokens = counter.special_tokens
+    
+    for word in text.split():
+        word_tokens = counter.count_raw(word)
+        if current and current_tokens + word_tokens > budget:
+            chunks.append(" ".join(current))
+            current = []
+            current_tokens = counter.special_tokens
+        current.append(word)
+        current_tokens += word_tokens
+    
+    if current:
+        chunks.append(" ".join(current))
+    
+    result = []
+    for chunk in chunks:
+        result.extend(_split_to_token_budget(chunk, counter, budget))
+    return result
+
+
+def _split_to_token_budget(chunk: str, counter, budget: int) -> List[str]:
+    """Halve a chunk at word boundaries until every part fits the budget"""
+    words = chunk.split()
+    if len(words) <= 1 or counter.count(chunk) <= budget:
+        return [chunk]
+    middle = len(words) // 2
+    return (_split_to_token_budget(" ".join(words[:middle]), counter, budget) +
+            _split_to_token_budget(" ".join(words[middle:]), counter, budget))
+
+# ---------------------------------------------------------------------------
+# Section-aware chunking of layout blocks
+#
+# Blocks come from extract_text.analyze_pdf_layout: headings, paragraphs and
+# tables in reading order. Chunks never straddle a section boundary unless
+# several small sections fit in one chunk together, and every chunk starts
+# with the heading path of the section it belongs to, so a chunk retrieved
+# on its own still says where in the RFP it came from.
+# ---------------------------------------------------------------------------
+
+def _render_block(block: Dict[str, object], table_format: str = "markdown") -> str:
+    if block["type"] == "heading":
+        return "#" * block.get("level", 2) + " " + block["text"]
+    if block["type"] == "table":
+        return render_table(block["rows"], table_format)
+    return block["text"]
+
+
+def blocks_to_text(blocks: List[Dict[str, object]], table_format: str = "markdown") -> str:
+    """
+    Flatten layout blocks into markdown text (headings, paragraphs, tables)
+    
+    Args:
+        blocks: Layout blocks in reading order
+        table_format: Table serialization, "markdown" or "csv" (see document_processing.tables)
+    
+    Returns:
+        str: Document text with blank lines between blocks
+    """
+    return "\n\n".join(_render_block(block, table_format) for block in blocks)
+
+
+def _group_sections(blocks: List[Dict[str, object]]) -> List[Tuple[List[Dict[str, object]], List[Dict[str, object]]]]:
+    """Split blocks into (heading path, body blocks) sections; sections without a body are dropped"""
+    sections = []
+    path = []
+    body = []
+    for block in blocks:
+        if block["type"] == "heading":
+            if body:
+                sections.append((path, body))
+            level = block.get("level", 2)
+            path = [heading for heading in path if heading.get("level", 2) < level] + [block]
+            body = []
+        else:
+            body.append(block)
+    if body:
+        sections.append((path, body))
+    return sections
+
+
+def _split_table(rows: List[List[str]], counter, budget: int, prefix: str, table_format: str) -> List[str]:
+    """Split a table into row groups that fit the budget, repeating the header row in each"""
+    header, body = rows[0], rows[1:]
+    pieces = []
+    group = []
+    for row in body:
+        if group and counter.count(prefix + render_table([header] + group + [row], table_format)) > budget:
+            pieces.append(render_table([header] + group, table_format))
+            group = []
+        group.append(row)
+    if group or not pieces:
+        pieces.append(render_table([header] + group, table_format))
+    
+    result = []
+    for piece in pieces:
+        if counter.count(prefix + piece) > budget:
+            # A single row too large for a chunk: fall back to plain token chunks
+            result.extend(chunk_text_by_tokens(piece, counter, budget - counter.count_raw(prefix)))
+        else:
+            result.append(piece)
+    return result
+
+
+def chunk_by_sections(blocks: List[Dict[str, object]], counter, max_tokens: int = None,
+                      table_format: str = "markdown") -> List[str]:
+    """
+    Chunk layout blocks along section boundaries
+    
+    Consecutive small sections are merged while they fit the budget. A section
+    that does not fit in a chunk of its own is split between paragraphs, with
+    its heading path repeated at the top of every part; paragraphs that are
+    still too large are split with chunk_text_by_tokens and tables by rows,
+    with the header row repeated.
+    
+    Args:
+        blocks: Layout blocks in reading order (see extract_text.analyze_pdf_layout)
+        counter: TokenCounter for the consuming model (see document_processing.tokenization)
+        max_tokens: Token limit per chunk (default: counter.max_tokens)
+    
+    Returns:
+        List[str]: Markdown chunks
+    """
+    budget = max_tokens or counter.max_tokens
+    if not budget:
+        raise ValueError("max_tokens is required for a counter without a model limit")
+    
+    chunks = []
+    current = []
+    current_path = []
+    
+    def flush():
+        nonlocal current, current_path
+        if current:
+            chunks.append("\n\n".join(current))
+        current = []
+        current_path = []
+    
+    for path, body in _group_sections(blocks):
+        # Only the headings that differ from the previous section in the chunk are repeated
+        shared = 0
+        while shared < min(len(path), len(current_path)) and path[shared] is current_path[shared]:
+            shared += 1
+        headings = [_render_block(heading) for heading in path[shared:]]
+        parts = [_render_block(block, table_format) for block in body]
+        
+        if current and counter.count("\n\n".join(current + headings + parts)) <= budget:
+            current.extend(headings + parts)
+            current_path = path
+            continue
+        
+        flush()
+        full_headings = [_render_block(heading) for heading in path]
+        if counter.count("\n\n".join(full_headings + parts)) <= budget:
+            current = full_headings + parts
+            current_path = path
+            continue
+        
+        # Oversized section: pack its blocks, each part under the full heading path
+        prefix = "\n\n".join(full_headings)
+        if counter.count(prefix) > budget // 2:
+            prefix = ""
+        prefix_text = prefix + "\n\n" if prefix else ""
+        
+        pieces = []
+        for block, part in zip(body, parts):
+            if counter.count(prefix_text + part) <= budget:
+                pieces.append(part)
+            elif block["type"] == "table" and block["rows"]:
+                pieces.extend(_split_table(block["rows"], counter, budget, prefix_text, table_format))
+            else:
+                pieces.extend(chunk_text_by_tokens(part, counter, budget - counter.count_raw(prefix_text)))
+        
+        group = []
+        for piece in pieces:
+            if group and counter.count(prefix_text + "\n\n".join(group + [piece])) > budget:
+                chunks.append(prefix_text + "\n\n".join(group))
+                group = []
+            group.append(piece)
+        if group:
+            # The last part stays open so a following small section can join it
+            current = ([prefix] if prefix else []) + group
+            current_path = path if prefix else []
+    
+    flush()
+    return chunks
+
+
+# ---------------------------------------------------------------------------
+# Streaming variants
+#
+# These consume text incrementally from an iterable of pieces (pages, lines,
+# file reads) and yield chunks as soon as they are complete. Each chunk is a
+# dict {"text", "start", "end"} where start/end are character offsets into the
+# concatenation of all pieces, so later stages can map chunks back to the
+# source without the whole document ever being held in memory. Pieces are
+# concatenated as given, so include separators (e.g. the trailing newline of
+# each line) when splitting a document.
+# ---------------------------------------------------------------------------
+
+_WORD = re.compile(r"\S+")
+
+
+def iter_words(pieces: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yield (word, start, end) for every whitespace-separated word in a stream
+    
+    Words split across piece boundaries are joined back together.
+    
+    Args:
+        pieces: Iterable of text fragments
+        
+    Yields:
+        Tuple[str, int, int]: Word and its character offsets
+    """
+    offset = 0
+    carry, carry_start = "", 0
+    
+    for piece in pieces:
+        matched = False
+        for match in _WORD.finditer(piece):
+            matched = True
+            word, start, end = match.group(), offset + match.start(), offset + match.end()
+            if carry:
+                if match.start() == 0:
+                    word, start = carry + word, carry_start
+                else:
+                    yield carry, carry_start, carry_start + len(carry)
+                carry = ""
+            
+            # A word touching the end of the piece may continue in the next one
+            if match.end() == len(piece):
+                carry, carry_start = word, start
+            else:
+                yield word, start, end
+        
+        if not matched and piece and carry:
+            yield carry, carry_start, carry_start + len(carry)
+            carry = ""
+        offset += len(piece)
+    
+    if carry:
+        yield carry, carry_start, carry_start + len(carry)
+
+
+def iter_paragraphs(pieces: Iterable[str]) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yield (paragraph, start, end) for blank-line separated paragraphs in a stream
+    
+    Matches chunk_by_paragraphs: text is split on "\n\n" and each paragraph
+    is stripped; empty paragraphs are skipped. Only the current paragraph is
+    buffered.
+    
+    Args:
+        pieces: Iterable of text fragments
+        
+    Yields:
+        Tuple[str, int, int]: Stripped paragraph and its character offsets
+    """
+    buffer, buffer_start = "", 0
+    
+    def emit(raw: str, raw_start: int):
+        stripped = raw.strip()
+        if stripped:
+            start = raw_start + (len(raw) - len(raw.lstrip()))
+            return stripped, start, start + len(stripped)
+        return None
+    
+    for piece in pieces:
+        buffer += piece
+        while True:
+            split_at = buffer.find("\n\n")
+            if split_at < 0:
+                break
+            paragraph = emit(buffer[:split_at], buffer_start)
+            if paragraph:
+                yield paragraph
+            buffer = buffer[split_at + 2:]
+            buffer_start += split_at + 2
+    
+    paragraph = emit(buffer, buffer_start)
+    if paragraph:
+        yield paragraph
+
+
+def _make_chunk(words: List[Tuple[str, int, int]], separator: str = " ") -> Dict[str, object]:
+    """Build a chunk dict from (word, start, end) tuples"""
+    return {
+        "text": separator.join(word for word, _, _ in words),
+        "start": words[0][1],
+        "end": words[-1][2]
+    }
+
+
+def stream_chunks(pieces: Iterable[str], max_tokens: int = 200) -> Iterator[Dict[str, object]]:
+    """
+    Streaming version of chunk_text: fixed-size word chunks
+    
+    Args:
+        pieces: Iterable of text fragments (pages, lines, ...)
+        max_tokens: Maximum number of words per chunk
+        
+    Yields:
+        dict: {"text", "start", "end"} for each chunk
+    """
+    current = []
+    for word in iter_words(pieces):
+        current.append(word)
+        if len(current) == max_tokens:
+            yield _make_chunk(current)
+            current = []
+    if current:
+        yield _make_chunk(current)
+
+
+def stream_chunks_with_overlap(pieces: Iterable[str], chunk_size: int = 700, overlap: int = 100) -> Iterator[Dict[str, object]]:
+    """
+    Streaming version of chunk_text_with_overlap
+    
+    Unlike the list version, a document shorter than chunk_size is yielded
+    with normalized whitespace rather than verbatim.
+    
+    Args:
+        pieces: Iterable of text fragments
+        chunk_size: Number of words per chunk
+        overlap: Number of overlapping words between chunks
+        
+    Yields:
+        dict: {"text", "start", "end"} for each chunk
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    
+    window = []
+    pending = False  # window holds words not yet emitted in any chunk
+    for word in iter_words(pieces):
+        window.append(word)
+        pending = True
+        if len(window) == chunk_size:
+            yield _make_chunk(window)
+            window = window[chunk_size - overlap:]
+            pending = False
+    if pending:
+        yield _make_chunk(window)
+
+
+def stream_chunks_by_sentences(pieces: Iterable[str], max_words: int = 700) -> Iterator[Dict[str, object]]:
+    """
+    Streaming version of chunk_by_sentences
+    
+    A sentence ends at a word ending in ".", "!" or "?".
+    
+    Args:
+        pieces: Iterable of text fragments
+        max_words: Maximum words per chunk
+        
+    Yields:
+        dict: {"text", "start", "end"} for each chunk
+    """
+    current = []
+    sentence = []
+    for word in iter_words(pieces):
+        sentence.append(word)
+        if word[0][-1] in ".!?":
+            if current and len(current) + len(sentence) > max_words:
+                yield _make_chunk(current)
+                current = []
+            current.extend(sentence)
+            sentence = []
+    
+    if sentence:
+        if current and len(current) + len(sentence) > max_words:
+            yield _make_chunk(current)
+            current = []
+        current.extend(sentence)
+    if current:
+        yield _make_chunk(current)
+
+
+def stream_chunks_by_paragraphs(pieces: Iterable[str], max_words: int = 700) -> Iterator[Dict[str, object]]:
+    """
+    Streaming version of chunk_by_paragraphs
+    
+    Args:
+        pieces: Iterable of text fragments
+        max_words: Maximum words per chunk
+        
+    Yields:
+        dict: {"text", "start", "end"} for each chunk
+    """
+    current = []  # (paragraph, start, end)
+    current_word_count = 0
+    
+    def flush():
+        return {
+            "text": "\n\n".join(paragraph for paragraph, _, _ in current),
+            "start": current[0][1],
+            "end": current[-1][2]
+        }
+    
+    for paragraph, start, end in iter_paragraphs(pieces):
+        paragraph_word_count = len(paragraph.split())
+        
+        if current_word_count + paragraph_word_count <= max_words:
+            current.append((paragraph, start, end))
+            current_word_count += paragraph_word_count
+            continue
+        
+        if current:
+            yield flush()
+        
+        # If single paragraph exceeds max_words, chunk it separately
+        if paragraph_word_count > max_words:
+            for chunk in stream_chunks([paragraph], max_words):
+                chunk["start"] += start
+                chunk["end"] += start
+                yield chunk
+            current = []
+            current_word_count = 0
+        else:
+            current = [(paragraph, start, end)]
+            current_word_count = paragraph_word_count
+    
+    if current:
+        yield flush()
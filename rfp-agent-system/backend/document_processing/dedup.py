@@ -0,0 +1,158 @@
+# Duplicate and near-duplicate chunk elimination
+import hashlib
+import re
+import zlib
+from typing import Any, Dict, List
+
+import numpy as np
+
+# MinHash parameters: NUM_PERM = BANDS * ROWS_PER_BAND
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = 4
+SHINGLE_SIZE = 5
+_PRIME = (1 << 61) - 1
+
+
+def _normalize(text: str) -> str:
+    """Lowercase and collapse whitespace so formatting differences do not matter"""
+    return " ".join(text.lower().split())
+
+
+def _shingles(text: str) -> List[str]:
+    """Word n-grams of a normalized text (the whole text if it is shorter)"""
+    words = re.findall(r"\w+", text)
+    if len(words) <= SHINGLE_SIZE:
+        return [" ".join(words)]
+    return [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+
+class _MinHasher:
+    """MinHash signatures from NUM_PERM random linear hash functions"""
+    
+    def __init__(self, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Keep coefficients below 2^31 so a * x fits in uint64 for 32-bit x
+        self.a = rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+    
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.array(
+            [zlib.crc32(shingle.encode("utf-8")) for shingle in _shingles(text)],
+            dtype=np.uint64
+        )
+        permuted = (hashes[:, None] * self.a + self.b) % _PRIME
+        return permuted.min(axis=0)
+
+
+def deduplicate_chunks(chunks: List[str], threshold: float = 1.0, token_counter=None,
+                       token_budget: int = None, separator: str = "\n\n") -> Dict[str, Any]:
+    """
+    Collapse identical and near-identical chunks before embedding and LLM calls
+    
+    Identical chunks (after normalizing case and whitespace) are grouped by
+    SHA-1. Remaining chunks are compared with MinHash + LSH banding, and pairs
+    whose estimated Jaccard similarity of word 5-grams is >= threshold are
+    merged. The first occurrence of each group is kept; only its text is
+    returned, so near-duplicate merging (threshold < 1.0) drops the variant
+    texts of the other members.
+    
+    Args:
+        chunks: Text chunks in document order
+        threshold: Minimum estimated Jaccard similarity to treat chunks as duplicates
+        token_counter: Optional TokenCounter used to report prompt tokens saved
+        token_budget: Prompt budget the chunks are packed into (see tokenization.pack_to_token_budget);
+            when given, only duplicates that would have fit in the packed prompt count as saved
+        separator: Text placed between packed chunks
+    
+    Returns:
+        dict: {
+            "chunks": kept chunk texts in document order,
+            "sources": for each kept chunk, the 0-based indices of every input chunk it stands for,
+            "report": counts of exact/near duplicates, embeddings and tokens saved
+        }
+    """
+    parent = list(range(len(chunks)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # Keep the earliest chunk as the representative
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    
+    # Pass 1: exact duplicates
+    first_by_hash = {}
+    exact_duplicates = 0
+    normalized = [_normalize(chunk) for chunk in chunks]
+    for i, text in enumerate(normalized):
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        if digest in first_by_hash:
+            union(first_by_hash[digest], i)
+            exact_duplicates += 1
+        else:
+            first_by_hash[digest] = i
+    
+    # Pass 2: near duplicates among the distinct chunks
+    near_duplicates = 0
+    if threshold < 1.0:
+        hasher = _MinHasher()
+        candidates = sorted(first_by_hash.values())
+        signatures = {i: hasher.signature(normalized[i]) for i in candidates}
+        buckets = {}
+        for i in candidates:
+            signature = signatures[i]
+            for band in range(BANDS):
+                key = (band, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes())
+                buckets.setdefault(key, []).append(i)
+        
+        for members in buckets.values():
+            for position, j in enumerate(members):
+                for i in members[:position]:
+                    if find(i) == find(j):
+                        break
+                    similarity = float(np.mean(signatures[i] == signatures[j]))
+                    if similarity >= threshold:
+                        union(i, j)
+                        near_duplicates += 1
+                        break
+    
+    groups = {}
+    for i in range(len(chunks)):
+        groups.setdefault(find(i), []).append(i)
+    representatives = sorted(groups)
+    kept = [chunks[i] for i in representatives]
+    sources = [groups[i] for i in representatives]
+    
+    report = {
+        "input_chunks": len(chunks),
+        "unique_chunks": len(kept),
+        "exact_duplicates": exact_duplicates,
+        "near_duplicates": near_duplicates,
+        "embeddings_saved": len(chunks) - len(kept)
+    }
+    if token_counter is not None:
+        removed = {i for members in sources for i in members[1:]}
+        if token_budget is None:
+            report["tokens_saved"] = sum(token_counter.count_raw(chunks[i]) for i in removed)
+        else:
+            # Tokens the duplicates take up in the budget-packed prompt without deduplication;
+            # anything past the budget was never sent, so it is not a saving
+            separator_tokens = token_counter.count_raw(separator)
+            used = 0
+            saved = 0
+            for i, chunk in enumerate(chunks):
+                if used >= token_budget:
+                    break
+                tokens = min((separator_tokens if i else 0) + token_counter.count_raw(chunk), token_budget - used)
+                used += tokens
+                if i in removed:
+                    saved += tokens
+            report["tokens_saved"] = saved
+    
+    return {"chunks": kept, "sources": sources, "report": report}
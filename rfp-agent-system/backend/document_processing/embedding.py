@@ -1,11 +1,20 @@
 # Document embedding generation
-from sentence_transformers import SentenceTransformer
 from typing import List, Union
 import numpy as np
+import sys
+import os
 
-# Initialize the embedding model
+# Add parent directory to path to import the shared embedding cache and model
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding.cache import cached_encode
 # all-mpnet-base-v2: 768 dimensions, better quality than all-MiniLM-L6-v2
-model = SentenceTransformer("all-mpnet-base-v2")
+# Loaded lazily and shared with embedding.embedder
+from embedding.model_provider import MODEL_NAME, get_model
+
+
+def _encode(texts: List[str], show_progress: bool = False):
+    """Run the model on texts that missed the embedding cache"""
+    return get_model().encode(texts, convert_to_numpy=True, show_progress_bar=show_progress)
 
 
 def embed(text: str) -> List[float]:
@@ -18,7 +27,7 @@ def embed(text: str) -> List[float]:
     Returns:
         List[float]: Embedding vector as a list
     """
-    embedding = model.encode(text, convert_to_numpy=True)
+    embedding = cached_encode([text], MODEL_NAME, _encode)[0]
     return embedding.tolist()  # store as list for DB
 
 
@@ -32,7 +41,7 @@ def generate_embedding(text: str) -> List[float]:
     Returns:
         List[float]: Embedding vector as a list
     """
-    embedding = model.encode(text, convert_to_numpy=True)
+    embedding = cached_encode([text], MODEL_NAME, _encode)[0]
     return embedding.tolist()  # store as list for DB
 
 
@@ -46,7 +55,9 @@ def embed_batch(texts: List[str]) -> List[List[float]]:
     Returns:
         List[List[float]]: List of embedding vectors
     """
-    embeddings = model.encode(texts, convert_to_numpy=True)
+    if not texts:
+        return []
+    embeddings = cached_encode(texts, MODEL_NAME, _encode)
     return embeddings.tolist()
 
 
@@ -61,7 +72,7 @@ def embed_chunks(chunks: List[str], show_progress: bool = True) -> List[dict]:
     Returns:
         List[dict]: List of dictionaries containing chunk text and embedding
     """
-    embeddings = model.encode(chunks, show_progress_bar=show_progress)
+    embeddings = cached_encode(chunks, MODEL_NAME, lambda missing: _encode(missing, show_progress))
     
     result = []
     for idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
@@ -86,8 +97,7 @@ def compute_similarity(text1: str, text2: str) -> float:
     Returns:
         float: Similarity score between 0 and 1
     """
-    emb1 = model.encode(text1)
-    emb2 = model.encode(text2)
+    emb1, emb2 = cached_encode([text1, text2], MODEL_NAME, _encode)
     
     # Compute cosine similarity
     similarity = np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
@@ -102,8 +112,9 @@ def get_model_info() -> dict:
     Returns:
         dict: Model information including dimension and max sequence length
     """
+    model = get_model()
     return {
-        "model_name": "all-mpnet-base-v2",
+        "model_name": MODEL_NAME,
         "embedding_dimension": model.get_sentence_embedding_dimension(),
         "max_seq_length": model.max_seq_length
     }
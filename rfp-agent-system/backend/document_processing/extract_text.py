@@ -1,46 +1,338 @@
 # Text extraction from RFP documents
 from azure.ai.documentintelligence import DocumentIntelligenceClient
+from azure.ai.documentintelligence.aio import DocumentIntelligenceClient as AsyncDocumentIntelligenceClient
 from azure.core.credentials import AzureKeyCredential
-from azure.storage.blob import BlobServiceClient
+import asyncio
 import sys
 import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Add parent directory to path to import config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import config
+from document_processing.extraction_cache import get_extraction_cache
+from document_processing.local_pdf import count_pages, extract_pages, format_page_ranges, timing_report
+from document_processing.tables import compact_tables, render_table
+from storage_clients import get_async_blob_service_client, get_blob_service_client
 
 
-def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
+def extract_text_from_pdf_bytes(file_bytes: bytes, model_id: str = "prebuilt-read") -> str:
     """
     Extract text from PDF document bytes using Azure Form Recognizer
     Works with private blob storage
     
     Args:
         file_bytes: PDF file content as bytes
+        model_id: Analyze model ("prebuilt-read" or "prebuilt-layout")
         
     Returns:
         str: Extracted text content from the document
     """
-    if not config.FORM_RECOGNIZER_ENDPOINT or not config.FORM_RECOGNIZER_KEY:
-        raise ValueError("Azure Form Recognizer credentials not configured")
+    # Extract all text content
+    full_text = "\n".join([
+        line
+        for page in analyze_pdf_pages(file_bytes, model_id)
+        for line in page["lines"]
+    ])
+    
+    return full_text
+
+
+def analyze_pdf_pages(file_bytes: bytes, model_id: str = "prebuilt-read", pages: str = None) -> list:
+    """
+    Page/line structure of a PDF, served from the extraction cache when possible
+    
+    With EXTRACTION_OFFLINE=true a cache miss raises instead of calling the
+    service, so the extraction step can be replayed without network access.
+    
+    Documents longer than EXTRACTION_PAGES_PER_JOB pages are split into page
+    ranges that are analyzed as separate jobs, at most
+    EXTRACTION_MAX_CONCURRENCY at a time, and stitched back in page order.
+    
+    Args:
+        file_bytes: PDF file content as bytes
+        model_id: Analyze model ("prebuilt-read" or "prebuilt-layout")
+        pages: Optional 1-based page selection, e.g. "1-3,7" (default: every page)
+        
+    Returns:
+        list: [{"page_number": int, "lines": [str, ...]}, ...] in page order
+    """
+    return _analyze_document(file_bytes, model_id, pages, _page_lines)
+        
+    
+def analyze_pdf_layout(file_bytes: bytes) -> list:
+    """
+    Headings, paragraphs and tables of a PDF in reading order (prebuilt-layout)
+    
+    Page headers, footers and page numbers are dropped, and paragraphs that
+    belong to a table are represented only by the table.
+    
+    Args:
+        file_bytes: PDF file content as bytes
+    
+    Returns:
+        list: Blocks, each one of
+            {"type": "heading", "level": 1 (title) or 2 (section heading), "text", "page_number", "offset"}
+            {"type": "paragraph", "text", "page_number", "offset"}
+            {"type": "table", "rows": [[cell, ...], ...], "page_number", "offset"}
+    """
+    return _analyze_document(file_bytes, "prebuilt-layout", None, _layout_blocks)
+
+
+async def extract_text_from_pdf_bytes_async(file_bytes: bytes, model_id: str = "prebuilt-read") -> str:
+    """
+    Async version of extract_text_from_pdf_bytes (does not block the event loop)
+    
+    Args:
+        file_bytes: PDF file content as bytes
+        model_id: Analyze model ("prebuilt-read" or "prebuilt-layout")
+        
+    Returns:
+        str: Extracted text content from the document
+    """
+    pages = await analyze_pdf_pages_async(file_bytes, model_id)
+    return "\n".join(line for page in pages for line in page["lines"])
+
+
+async def analyze_pdf_pages_async(file_bytes: bytes, model_id: str = "prebuilt-read", pages: str = None) -> list:
+    """
+    Async version of analyze_pdf_pages using the aio Document Intelligence client
+    
+    Page-range jobs of large documents run as concurrent tasks, at most
+    EXTRACTION_MAX_CONCURRENCY at a time.
+    
+    Args:
+        file_bytes: PDF file content as bytes
+        model_id: Analyze model ("prebuilt-read" or "prebuilt-layout")
+        pages: Optional 1-based page selection, e.g. "1-3,7" (default: every page)
         
+    Returns:
+        list: [{"page_number": int, "lines": [str, ...]}, ...] in page order
+    """
+    return await _analyze_document_async(file_bytes, model_id, pages, _page_lines)
+
+
+async def analyze_pdf_layout_async(file_bytes: bytes) -> list:
+    """Async version of analyze_pdf_layout"""
+    return await _analyze_document_async(file_bytes, "prebuilt-layout", None, _layout_blocks)
+
+
+def _analyze_document(file_bytes: bytes, model_id: str, pages: str, parse) -> list:
+    """Cached, page-range parallel analysis; parse turns one AnalyzeResult into a list of items"""
+    cache, cache_model, cached = _cached_result(file_bytes, model_id, pages, parse)
+    if cached is not None:
+        return cached
+    
     client = DocumentIntelligenceClient(
         endpoint=config.FORM_RECOGNIZER_ENDPOINT,
         credential=AzureKeyCredential(config.FORM_RECOGNIZER_KEY)
     )
     
+    page_ranges = split_page_ranges(file_bytes, config.EXTRACTION_PAGES_PER_JOB) if pages is None else []
+    if len(page_ranges) > 1:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=config.EXTRACTION_MAX_CONCURRENCY) as pool:
+            jobs = list(pool.map(lambda page_range: _analyze(client, file_bytes, model_id, page_range, parse), page_ranges))
+        extracted = _stitch(jobs)
+        print(f"✓ Analyzed {len(page_ranges)} page-range jobs "
+              f"(max {config.EXTRACTION_MAX_CONCURRENCY} concurrent) in {time.perf_counter() - start:.1f}s")
+    else:
+        extracted = _analyze(client, file_bytes, model_id, pages, parse)
+    
+    if cache is not None:
+        cache.put(file_bytes, cache_model, extracted)
+    return extracted
+
+
+async def _analyze_document_async(file_bytes: bytes, model_id: str, pages: str, parse) -> list:
+    """Async version of _analyze_document"""
+    cache, cache_model, cached = _cached_result(file_bytes, model_id, pages, parse)
+    if cached is not None:
+        return cached
+    
+    page_ranges = []
+    if pages is None:
+        # Counting pages parses the PDF; keep it off the event loop
+        page_ranges = await asyncio.to_thread(split_page_ranges, file_bytes, config.EXTRACTION_PAGES_PER_JOB)
+    
+    async with AsyncDocumentIntelligenceClient(
+        endpoint=config.FORM_RECOGNIZER_ENDPOINT,
+        credential=AzureKeyCredential(config.FORM_RECOGNIZER_KEY)
+    ) as client:
+        if len(page_ranges) > 1:
+            start = time.perf_counter()
+            semaphore = asyncio.Semaphore(config.EXTRACTION_MAX_CONCURRENCY)
+            
+            async def run_job(page_range):
+                async with semaphore:
+                    return await _analyze_async(client, file_bytes, model_id, page_range, parse)
+            
+            extracted = _stitch(await asyncio.gather(*(run_job(page_range) for page_range in page_ranges)))
+            print(f"✓ Analyzed {len(page_ranges)} page-range jobs "
+                  f"(max {config.EXTRACTION_MAX_CONCURRENCY} concurrent) in {time.perf_counter() - start:.1f}s")
+        else:
+            extracted = await _analyze_async(client, file_bytes, model_id, pages, parse)
+    
+    if cache is not None:
+        cache.put(file_bytes, cache_model, extracted)
+    return extracted
+
+
+def _cached_result(file_bytes: bytes, model_id: str, pages: str, parse):
+    """
+    Cache lookup shared by the sync and async analyzers
+    
+    Returns:
+        (cache, cache key model, cached items or None); raises when the service
+        cannot be called (offline mode or missing credentials)
+    """
+    cache = get_extraction_cache()
+    cache_model = model_id
+    if parse is _layout_blocks:
+        cache_model += ":blocks"
+    if pages:
+        cache_model += f":{pages}"
+    if cache is not None:
+        cached = cache.get(file_bytes, cache_model)
+        if cached is not None:
+            return cache, cache_model, cached
+    if config.EXTRACTION_OFFLINE:
+        raise LookupError(f"No cached {cache_model} extraction for this document (EXTRACTION_OFFLINE is set)")
+    
+    if not config.FORM_RECOGNIZER_ENDPOINT or not config.FORM_RECOGNIZER_KEY:
+        raise ValueError("Azure Form Recognizer credentials not configured")
+    return cache, cache_model, None
+
+
+def _stitch(jobs: list) -> list:
+    """Merge the items of page-range jobs back into document order"""
+    return sorted(
+        (item for job in jobs for item in job),
+        key=lambda item: (item["page_number"], item.get("offset", 0))
+    )
+
+
+def _page_lines(result) -> list:
+    """Compact page/line structure of an AnalyzeResult"""
+    return [
+        {"page_number": page.page_number, "lines": [line.content for line in page.lines or []]}
+        for page in result.pages
+    ]
+
+
+# Paragraph roles that repeat on every page and carry no content
+LAYOUT_SKIP_ROLES = {"pageHeader", "pageFooter", "pageNumber"}
+
+
+def _layout_blocks(result) -> list:
+    """Reading-order heading/paragraph/table blocks of a prebuilt-layout AnalyzeResult"""
+    def first_page(element):
+        regions = element.bounding_regions or []
+        return regions[0].page_number if regions else 0
+    
+    def first_offset(element):
+        spans = element.spans or []
+        return spans[0].offset if spans else 0
+    
+    tables = result.tables or []
+    table_spans = [(span.offset, span.offset + span.length) for table in tables for span in table.spans or []]
+    
+    blocks = []
+    for paragraph in result.paragraphs or []:
+        if paragraph.role in LAYOUT_SKIP_ROLES:
+            continue
+        offset = first_offset(paragraph)
+        if any(start <= offset < end for start, end in table_spans):
+            continue
+        block = {"type": "paragraph", "text": paragraph.content}
+        if paragraph.role in ("title", "sectionHeading"):
+            block = {"type": "heading", "level": 1 if paragraph.role == "title" else 2, "text": paragraph.content}
+        block.update(page_number=first_page(paragraph), offset=offset)
+        blocks.append(block)
+    
+    for table in tables:
+        rows = [[""] * table.column_count for _ in range(table.row_count)]
+        for cell in table.cells:
+            rows[cell.row_index][cell.column_index] = cell.content
+        blocks.append({"type": "table", "rows": rows, "page_number": first_page(table), "offset": first_offset(table)})
+    
+    blocks.sort(key=lambda block: (block["page_number"], block["offset"]))
+    return blocks
+
+
+async def _analyze_async(client, file_bytes: bytes, model_id: str, pages: str = None, parse=_page_lines) -> list:
+    """One analyze job on the aio client"""
+    poller = await client.begin_analyze_document(model_id, body=file_bytes, pages=pages, content_type="application/pdf")
+    return parse(await poller.result())
+
+
+def _analyze(client, file_bytes: bytes, model_id: str, pages: str = None, parse=_page_lines) -> list:
+    """One analyze job; returns the parsed items of the selected pages"""
     # Analyze from bytes instead of URL (works with private blob storage)
-    poller = client.begin_analyze_document("prebuilt-read", body=file_bytes, content_type="application/pdf")
-    result = poller.result()
+    poller = client.begin_analyze_document(model_id, body=file_bytes, pages=pages, content_type="application/pdf")
+    return parse(poller.result())
+
+
+def split_page_ranges(file_bytes: bytes, pages_per_job: int) -> list:
+    """
+    Page selections ("1-50", "51-100", ...) covering a PDF
     
-    # Extract all text content
-    full_text = "\n".join([
-        line.content 
-        for page in result.pages 
-        for line in page.lines
-    ])
+    Returns an empty list when the document fits in one job, splitting is
+    disabled (pages_per_job <= 0), or the page count cannot be read locally.
+    """
+    if pages_per_job <= 0:
+        return []
+    try:
+        page_count = count_pages(file_bytes)
+    except Exception as e:
+        print(f"⚠ Could not count PDF pages locally, analyzing as one job: {e}")
+        return []
+    if page_count <= pages_per_job:
+        return []
+    return [
+        f"{first}-{min(first + pages_per_job - 1, page_count)}"
+        for first in range(1, page_count + 1, pages_per_job)
+    ]
+
+
+def extract_text_from_pdf_bytes_local(file_bytes: bytes, workers: int = None) -> str:
+    """
+    Extract text from PDF bytes using the embedded text layer, without a network call
     
-    return full_text
+    Pages are extracted in a process pool. Pages without a usable text layer
+    (scanned images) are sent to Document Intelligence OCR in a single
+    request restricted to those pages.
+    
+    Args:
+        file_bytes: PDF file content as bytes
+        workers: Worker processes (default: config.LOCAL_PDF_WORKERS, 0 = CPU count)
+        
+    Returns:
+        str: Extracted text content from the document
+    """
+    start = time.perf_counter()
+    pages = extract_pages(file_bytes, workers=workers or config.LOCAL_PDF_WORKERS or None)
+    
+    scanned = [page for page in pages if page["scanned"]]
+    if scanned:
+        ocr_start = time.perf_counter()
+        ocr_pages = analyze_pdf_pages(
+            file_bytes, "prebuilt-read", pages=format_page_ranges([page["page_number"] for page in scanned])
+        )
+        ocr_ms = (time.perf_counter() - ocr_start) * 1000
+        ocr_text = {page["page_number"]: "\n".join(page["lines"]) for page in ocr_pages}
+        for page in scanned:
+            page["text"] = ocr_text.get(page["page_number"], "")
+            page["source"] = "ocr"
+            # One request covers every scanned page; attribute its time evenly
+            page["ms"] += ocr_ms / len(scanned)
+    
+    print(f"✓ Local PDF extraction in {(time.perf_counter() - start) * 1000:.0f} ms")
+    print(timing_report(pages))
+    
+    return "\n".join(page["text"] for page in pages if page["text"])
 
 
 def extract_text_from_pdf(file_url: str) -> str:
@@ -86,69 +378,135 @@ def extract_text_from_blob(blob_name: str) -> str:
     Returns:
         str: Extracted text content from the document
     """
-    if not config.BLOB_CONN_STRING:
-        raise ValueError("Azure Blob Storage connection string not configured")
+    # Extract text from bytes (works with private blob storage)
+    return extract_text_from_pdf_bytes(download_blob_bytes(blob_name))
+
+
+def download_blob_bytes(blob_name: str) -> bytes:
+    """
+    Download a document from Azure Blob Storage
+    
+    The blob is streamed to a temporary file in parallel ranges and read back
+    once, so the content is held in memory a single time.
+    
+    Args:
+        blob_name: Name of the blob file in storage
         
-    # Download blob content as bytes
-    blob_service_client = BlobServiceClient.from_connection_string(config.BLOB_CONN_STRING)
-    container_client = blob_service_client.get_container_client(config.BLOB_CONTAINER_NAME)
-    blob_client = container_client.get_blob_client(blob_name)
+    Returns:
+        bytes: Blob content
+    """
+    with tempfile.TemporaryFile() as f:
+        download_blob_to_file(blob_name, f)
+        f.seek(0)
+        return f.read()
+
+
+def download_blob_to_file(blob_name: str, f) -> int:
+    """
+    Stream a blob into a binary file object with ranged parallel downloads
     
-    # Download the blob content
-    blob_data = blob_client.download_blob()
-    file_bytes = blob_data.readall()
+    At most BLOB_MAX_CONCURRENCY ranges of BLOB_TRANSFER_CHUNK_MB are buffered
+    at a time, whatever the blob size.
     
-    # Extract text from bytes (works with private blob storage)
-    return extract_text_from_pdf_bytes(file_bytes)
+    Args:
+        blob_name: Name of the blob file in storage
+        f: Writable binary file object
+        
+    Returns:
+        int: Bytes written
+    """
+    blob_client = get_blob_service_client().get_blob_client(config.BLOB_CONTAINER_NAME, blob_name)
+    download_stream = blob_client.download_blob(max_concurrency=config.BLOB_MAX_CONCURRENCY)
+    return download_stream.readinto(f)
 
 
-def extract_text_with_structure(file_url: str) -> dict:
+async def download_blob_bytes_async(blob_name: str) -> bytes:
     """
-    Extract text with structural information (tables, paragraphs, etc.)
+    Async version of download_blob_bytes using the aio Blob Storage client
     
     Args:
-        file_url: URL of the document
+        blob_name: Name of the blob file in storage
         
     Returns:
-        dict: Structured document content including text, tables, and metadata
+        bytes: Blob content
     """
-    if not config.FORM_RECOGNIZER_ENDPOINT or not config.FORM_RECOGNIZER_KEY:
-        raise ValueError("Azure Form Recognizer credentials not configured")
+    with tempfile.TemporaryFile() as f:
+        await download_blob_to_file_async(blob_name, f)
+        f.seek(0)
+        return await asyncio.to_thread(f.read)
+
+
+async def download_blob_to_file_async(blob_name: str, f) -> int:
+    """
+    Async version of download_blob_to_file
+    
+    Args:
+        blob_name: Name of the blob file in storage
+        f: Writable binary file object
         
-    client = DocumentAnalysisClient(
-        endpoint=config.FORM_RECOGNIZER_ENDPOINT,
-        credential=AzureKeyCredential(config.FORM_RECOGNIZER_KEY)
-    )
+    Returns:
+        int: Bytes written
+    """
+    blob_client = get_async_blob_service_client().get_blob_client(config.BLOB_CONTAINER_NAME, blob_name)
+    download_stream = await blob_client.download_blob(max_concurrency=config.BLOB_MAX_CONCURRENCY)
+    return await download_stream.readinto(f)
+
+
+async def extract_text_from_blob_async(blob_name: str) -> str:
+    """
+    Async version of extract_text_from_blob
     
-    poller = client.begin_analyze_document_from_url("prebuilt-layout", file_url)
-    result = poller.result()
+    Args:
+        blob_name: Name of the blob file in storage
+        
+    Returns:
+        str: Extracted text content from the document
+    """
+    return await extract_text_from_pdf_bytes_async(await download_blob_bytes_async(blob_name))
+
+
+def extract_text_with_structure(file_bytes: bytes) -> dict:
+    """
+    Extract text with structural information (tables, paragraphs, etc.)
+    
+    Args:
+        file_bytes: PDF file content as bytes
+        
+    Returns:
+        dict: Structured document content including text, tables, and metadata;
+            each table also carries a compact CSV serialization ("csv") for prompts
+    """
+    blocks = compact_tables(analyze_pdf_layout(file_bytes))
     
     extracted_data = {
         "text": "",
         "tables": [],
         "paragraphs": [],
-        "page_count": len(result.pages)
+        "blocks": blocks,
+        "page_count": max((block["page_number"] for block in blocks), default=0)
     }
     
-    # Extract paragraphs
-    if result.paragraphs:
-        extracted_data["paragraphs"] = [p.content for p in result.paragraphs]
-        extracted_data["text"] = "\n\n".join(extracted_data["paragraphs"])
+    # Extract paragraphs (headings included, in reading order)
+    extracted_data["paragraphs"] = [block["text"] for block in blocks if block["type"] != "table"]
+    extracted_data["text"] = "\n\n".join(extracted_data["paragraphs"])
     
     # Extract tables
-    if result.tables:
-        for table in result.tables:
+    for block in blocks:
+        if block["type"] == "table":
+            rows = block["rows"]
             table_data = {
-                "row_count": table.row_count,
-                "column_count": table.column_count,
+                "row_count": len(rows),
+                "column_count": len(rows[0]) if rows else 0,
                 "cells": [
                     {
-                        "row_index": cell.row_index,
-                        "column_index": cell.column_index,
-                        "content": cell.content
+                        "row_index": row_index,
+                        "column_index": column_index,
+                        "content": content
                     }
-                    for cell in table.cells
-                ]
+                    for row_index, row in enumerate(rows)
+                    for column_index, content in enumerate(row)
+                ],
+                "csv": render_table(rows, "csv")
             }
             extracted_data["tables"].append(table_data)
     
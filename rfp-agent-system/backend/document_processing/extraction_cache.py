@@ -0,0 +1,226 @@
+# Persistent cache of Document Intelligence results (SQLite)
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+class ExtractionCache:
+    """
+    Extraction results keyed by SHA-256 of (model id, document bytes)
+    
+    Each entry is the page/line structure of one analyzed document:
+        [{"page_number": 1, "lines": ["...", ...]}, ...]
+    (or its layout blocks, under a "<model>:blocks" id) stored as
+    zlib-compressed JSON. When the total stored size exceeds
+    max_bytes, the least recently used entries are evicted.
+    """
+    
+    def __init__(self, path: str = None, max_bytes: int = None):
+        """
+        Open (or create) the cache file
+        
+        Args:
+            path: SQLite file path (default: config.EXTRACTION_CACHE_PATH)
+            max_bytes: Maximum compressed payload size (default: config.EXTRACTION_CACHE_MAX_MB)
+        """
+        self.path = path or config.EXTRACTION_CACHE_PATH
+        self.max_bytes = max_bytes or config.EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extractions ("
+            " key TEXT PRIMARY KEY,"
+            " model_id TEXT NOT NULL,"
+            " pages BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_extractions_last_used ON extractions(last_used)")
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(file_bytes: bytes, model_id: str) -> str:
+        """Content address of a document for a given analyze model"""
+        digest = hashlib.sha256()
+        digest.update(model_id.encode("utf-8") + b"\0")
+        digest.update(file_bytes)
+        return digest.hexdigest()
+    
+    def get(self, file_bytes: bytes, model_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up a cached extraction
+        
+        Args:
+            file_bytes: Document content
+            model_id: Analyze model, e.g. "prebuilt-read" or "prebuilt-layout"
+        
+        Returns:
+            The cached pages, or None
+        """
+        key = self.make_key(file_bytes, model_id)
+        with self._lock:
+            row = self._conn.execute("SELECT pages FROM extractions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE extractions SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+    
+    def put(self, file_bytes: bytes, model_id: str, pages: List[Dict[str, Any]]) -> None:
+        """
+        Store an extraction, evicting least recently used entries beyond max_bytes
+        
+        Args:
+            file_bytes: Document content
+            model_id: Analyze model the pages came from
+            pages: Page/line structure (see class docstring)
+        """
+        key = self.make_key(file_bytes, model_id)
+        payload = zlib.compress(json.dumps(pages, separators=(",", ":")).encode("utf-8"), 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions (key, model_id, pages, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model_id, payload, len(payload), time.time())
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM extractions").fetchone()[0]
+            if total > self.max_bytes:
+                evict = []
+                for old_key, size in self._conn.execute(
+                    "SELECT key, size FROM extractions WHERE key != ? ORDER BY last_used", (key,)
+                ):
+                    if total <= self.max_bytes:
+                        break
+                    evict.append((old_key,))
+                    total -= size
+                self._conn.executemany("DELETE FROM extractions WHERE key = ?", evict)
+                self.evictions += len(evict)
+            self._conn.commit()
+    
+    def clear(self) -> None:
+        """Remove every cached extraction"""
+        with self._lock:
+            self._conn.execute("DELETE FROM extractions")
+            self._conn.commit()
+    
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics
+        
+        Returns:
+            dict: Entry count, payload size and hit/miss/eviction counters
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM extractions"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "payload_mb": size / (1024 * 1024),
+            "max_mb": self.max_bytes / (1024 * 1024),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """
+    Process-wide cache instance, or None when EXTRACTION_CACHE_ENABLED is false
+    """
+    global _cache
+    if not config.EXTRACTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache()
+    return _cache
+
+
+def replay_benchmark(paths: List[str], model_id: str = "prebuilt-read") -> List[Dict[str, Any]]:
+    """
+    Time the extraction step for local PDFs using only cached results
+    
+    Runs with EXTRACTION_OFFLINE semantics: a file that is not cached is
+    reported as a miss instead of being sent to Document Intelligence.
+    prebuilt-layout is replayed from its layout blocks (the "prebuilt-layout:blocks"
+    entries analyze_pdf_layout stores).
+    
+    Args:
+        paths: PDF files to replay
+        model_id: Analyze model whose results are replayed
+    
+    Returns:
+        List of {"file", "cached", "pages", "lines", "blocks", "ms"} rows
+    """
+    cache = get_extraction_cache() or ExtractionCache()
+    cache_model = f"{model_id}:blocks" if model_id == "prebuilt-layout" else model_id
+    is_blocks = cache_model.endswith(":blocks")
+    report = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            file_bytes = f.read()
+        start = time.perf_counter()
+        items = cache.get(file_bytes, cache_model)
+        elapsed = (time.perf_counter() - start) * 1000
+        if not items:
+            pages, lines, blocks = 0, 0, 0
+        elif is_blocks:
+            pages, lines, blocks = len({block["page_number"] for block in items}), 0, len(items)
+        else:
+            pages, lines, blocks = len(items), sum(len(page["lines"]) for page in items), 0
+        report.append({
+            "file": path,
+            "cached": items is not None,
+            "pages": pages,
+            "lines": lines,
+            "blocks": blocks,
+            "ms": elapsed
+        })
+    return report
+
+
+if __name__ == "__main__":
+    # python document_processing/extraction_cache.py replay <file.pdf>... [--model prebuilt-layout]
+    # python document_processing/extraction_cache.py stats
+    args = sys.argv[1:]
+    if args and args[0] == "replay":
+        model = "prebuilt-read"
+        if "--model" in args:
+            position = args.index("--model")
+            model = args[position + 1]
+            del args[position:position + 2]
+        print(f"{'file':<40} {'cached':>6} {'pages':>6} {'lines':>7} {'blocks':>7} {'ms':>8}")
+        for row in replay_benchmark(args[1:], model):
+            print(f"{os.path.basename(row['file'])[:40]:<40} {str(row['cached']):>6} "
+                  f"{row['pages']:>6} {row['lines']:>7} {row['blocks']:>7} {row['ms']:>8.2f}")
+    else:
+        print(ExtractionCache().get_stats())
@@ -0,0 +1,130 @@
+# Document fingerprints and a manifest of already processed work (incremental re-ingestion)
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+
+def fingerprint_bytes(data: bytes) -> str:
+    """SHA-256 of the raw input document"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with whitespace collapsed, so re-extractions that differ only in layout compare equal"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def fingerprint_text(text: str) -> str:
+    """SHA-256 of the normalized extracted text"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def fingerprint_chunks(chunks: List[str]) -> List[str]:
+    """SHA-256 of every chunk text, in order"""
+    return [hashlib.sha256(chunk.encode("utf-8")).hexdigest() for chunk in chunks]
+
+
+def combine_fingerprints(*parts) -> str:
+    """Single fingerprint for several values (e.g. an input hash plus the settings applied to it)"""
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+# Shared by every IngestManifest in the process (the pipeline opens one per request)
+_update_lock = threading.Lock()
+
+
+def _write_json_atomic(path: str, data) -> None:
+    """Write JSON to a unique temp file next to path, then move it into place"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class IngestManifest:
+    """
+    Record of documents the pipeline has already processed
+    
+    Layout (root):
+        manifest.json         - {bytes fingerprint: record}
+        texts/<fp>.txt        - extracted text of each input
+        results/<key>.json    - agent results, keyed by a fingerprint of the agent input
+    
+    A record holds the filename the document was indexed under, the
+    normalized-text fingerprint, the chunking settings and the ChunkRefs and
+    SHA-256 of the chunks, so each pipeline stage can check whether its input
+    changed (and reused chunks can be checked against what was written).
+    """
+    
+    def __init__(self, root: str = "data/ingest"):
+        self.root = root
+        self.manifest_file = os.path.join(root, "manifest.json")
+        os.makedirs(os.path.join(root, "texts"), exist_ok=True)
+        os.makedirs(os.path.join(root, "results"), exist_ok=True)
+        self._records = {}
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                self._records = json.load(f)
+    
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Record for an input fingerprint, if it was processed before"""
+        return self._records.get(fingerprint)
+    
+    def find_chunks(self, text_fingerprint: str, chunk_config: str) -> Optional[Dict[str, Any]]:
+        """Most recent record that chunked the same normalized text with the same settings"""
+        matches = [
+            record for record in self._records.values()
+            if record.get("text_sha256") == text_fingerprint
+            and record.get("chunk_config") == chunk_config
+            and "chunk_refs" in record
+        ]
+        return max(matches, key=lambda record: record.get("updated_at", 0), default=None)
+    
+    def update(self, fingerprint: str, **fields) -> Dict[str, Any]:
+        """Merge fields into a record and persist the manifest"""
+        with _update_lock:
+            # Pick up records written by other pipeline runs since this manifest was opened
+            if os.path.exists(self.manifest_file):
+                with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                    self._records = json.load(f)
+            record = dict(self._records.get(fingerprint, {}))
+            record.update(fields, updated_at=time.time())
+            self._records[fingerprint] = record
+            _write_json_atomic(self.manifest_file, self._records)
+        return record
+    
+    def save_text(self, fingerprint: str, text: str) -> None:
+        with open(self._text_path(fingerprint), 'w', encoding='utf-8') as f:
+            f.write(text)
+    
+    def load_text(self, fingerprint: str) -> Optional[str]:
+        path = self._text_path(fingerprint)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    def save_results(self, key: str, results: Dict[str, Any]) -> None:
+        _write_json_atomic(self._results_path(key), results)
+    
+    def load_results(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._results_path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _text_path(self, fingerprint: str) -> str:
+        return os.path.join(self.root, "texts", f"{fingerprint}.txt")
+    
+    def _results_path(self, key: str) -> str:
+        return os.path.join(self.root, "results", f"{key}.json")
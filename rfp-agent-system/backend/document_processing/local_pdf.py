@@ -0,0 +1,162 @@
+# Local (offline) PDF text-layer extraction with page-parallel workers
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+# Pages with fewer non-whitespace characters than this are treated as scanned images
+MIN_TEXT_CHARS = 20
+
+# Long-lived worker pools by size, shared by every extraction in the process
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Set only inside pool worker processes: the last document opened (see _extract_worker_pages)
+_reader = None
+_reader_key = None
+
+
+def _open_reader(file_bytes: bytes):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ImportError("pypdf is required for local PDF extraction (pip install pypdf)")
+    return PdfReader(io.BytesIO(file_bytes))
+
+
+def _extract_pages(reader, page_numbers: List[int]) -> List[Dict[str, Any]]:
+    """Text layer of the given 1-based pages, timed per page"""
+    from pypdf.errors import PyPdfError
+    
+    pages = []
+    for page_number in page_numbers:
+        start = time.perf_counter()
+        try:
+            text = reader.pages[page_number - 1].extract_text() or ""
+        except (PyPdfError, ValueError, KeyError, TypeError) as e:
+            # A malformed page is handed to OCR rather than failing the document
+            print(f"⚠ Local extraction failed on page {page_number}: {e}")
+            text = ""
+        pages.append({
+            "page_number": page_number,
+            "text": text,
+            "ms": (time.perf_counter() - start) * 1000,
+            "source": "local"
+        })
+    return pages
+
+
+def _extract_worker_pages(source: tuple, page_numbers: List[int]) -> List[Dict[str, Any]]:
+    """
+    Pool task: extract pages of the PDF at source = (path, run id)
+    
+    A worker parses each document once and reuses the reader for the
+    document's later tasks.
+    """
+    global _reader, _reader_key
+    if _reader_key != source:
+        with open(source[0], 'rb') as f:
+            _reader = _open_reader(f.read())
+        _reader_key = source
+    return _extract_pages(_reader, page_numbers)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool kept for the life of the process
+    
+    Workers are spawned, not forked: extraction is called from worker threads
+    of a process that may hold locks (e.g. torch's), which a fork would copy.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[workers] = pool
+        return pool
+
+
+def count_pages(file_bytes: bytes) -> int:
+    """Number of pages in a PDF"""
+    return len(_open_reader(file_bytes).pages)
+
+
+def is_scanned(text: str, min_chars: int = MIN_TEXT_CHARS) -> bool:
+    """Whether a page has (almost) no text layer and needs OCR"""
+    return sum(1 for ch in text if not ch.isspace()) < min_chars
+
+
+def extract_pages(file_bytes: bytes, workers: int = None, pages_per_task: int = 8,
+                  min_chars: int = MIN_TEXT_CHARS) -> List[Dict[str, Any]]:
+    """
+    Extract the embedded text layer of every page
+    
+    Pages are split into runs of pages_per_task and extracted in a shared,
+    long-lived process pool (text-layer parsing is CPU bound). Small documents
+    are extracted in-process, where handing them to the pool would cost more
+    than it saves.
+    
+    Args:
+        file_bytes: PDF file content as bytes
+        workers: Worker processes (default: CPU count; 1 = in-process)
+        pages_per_task: Pages handed to a worker at a time
+        min_chars: Minimum non-whitespace characters for a page not to count as scanned
+    
+    Returns:
+        List of {"page_number", "text", "ms", "source", "scanned"} dicts in page order
+    """
+    page_count = count_pages(file_bytes)
+    workers = workers or os.cpu_count() or 1
+    tasks = [
+        list(range(first, min(first + pages_per_task, page_count + 1)))
+        for first in range(1, page_count + 1, pages_per_task)
+    ]
+    
+    if workers <= 1 or len(tasks) <= 1:
+        # Each call gets its own reader; callers may run concurrently in threads
+        reader = _open_reader(file_bytes)
+        pages = [page for task in tasks for page in _extract_pages(reader, task)]
+    else:
+        # Workers read the document from a temp file instead of receiving its bytes with every task
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(file_bytes)
+            source = (path, uuid.uuid4().hex)
+            results = _get_pool(workers).map(_extract_worker_pages, [source] * len(tasks), tasks)
+            pages = [page for result in results for page in result]
+        finally:
+            os.remove(path)
+    
+    for page in pages:
+        page["scanned"] = is_scanned(page["text"], min_chars)
+    return pages
+
+
+def format_page_ranges(page_numbers: List[int]) -> str:
+    """Compact page selection for Document Intelligence, e.g. [1, 2, 3, 7] -> "1-3,7" """
+    ranges = []
+    for page_number in sorted(set(page_numbers)):
+        if ranges and page_number == ranges[-1][1] + 1:
+            ranges[-1][1] = page_number
+        else:
+            ranges.append([page_number, page_number])
+    return ",".join(str(first) if first == last else f"{first}-{last}" for first, last in ranges)
+
+
+def timing_report(pages: List[Dict[str, Any]], slowest: int = 5) -> str:
+    """Human-readable per-page timing summary"""
+    local = [page for page in pages if page["source"] == "local"]
+    ocr = [page for page in pages if page["source"] == "ocr"]
+    lines = [
+        f"{len(pages)} pages: {len(local)} local text layer, {len(ocr)} OCR; "
+        f"local {sum(page['ms'] for page in local):.0f} ms total"
+    ]
+    for page in sorted(pages, key=lambda page: page["ms"], reverse=True)[:slowest]:
+        lines.append(f"  page {page['page_number']:>4}: {page['ms']:8.1f} ms ({page['source']}, {len(page['text'])} chars)")
+    return "\n".join(lines)
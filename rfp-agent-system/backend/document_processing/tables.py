@@ -0,0 +1,128 @@
+# Compact serialization of extracted tables for prompts and chunks
+import csv
+import io
+from typing import Any, Dict, List
+
+# "csv": header row once, comma separated (fewest tokens)
+# "markdown": pipe table (easier to read, ~1 extra token per cell)
+TABLE_FORMATS = ("csv", "markdown")
+
+
+def clean_rows(rows: List[List[str]]) -> List[List[str]]:
+    """
+    Normalize a table's cells and drop what carries no information
+    
+    Whitespace inside cells is collapsed, empty rows and columns are removed,
+    and rows that repeat the header (tables continued across pages) are dropped.
+    
+    Args:
+        rows: Cell texts, row by row (first row is the header)
+    
+    Returns:
+        List[List[str]]: Cleaned rows
+    """
+    rows = [[" ".join(str(cell).split()) for cell in row] for row in rows]
+    rows = [row for row in rows if any(row)]
+    if not rows:
+        return []
+    
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    keep = [column for column in range(width) if any(row[column] for row in rows)]
+    rows = [[row[column] for column in keep] for row in rows]
+    
+    header = rows[0]
+    return [header] + [row for row in rows[1:] if row != header]
+
+
+def compact_tables(blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Clean every table block and merge tables continued on the next page
+    
+    Consecutive table blocks with the same header row are one table split
+    by a page break; they are merged so the header is serialized only once.
+    
+    Args:
+        blocks: Layout blocks in reading order (see extract_text.analyze_pdf_layout)
+    
+    Returns:
+        List[Dict[str, Any]]: Blocks with compacted tables (input blocks are not modified)
+    """
+    result = []
+    for block in blocks:
+        if block["type"] != "table":
+            result.append(block)
+            continue
+        rows = clean_rows(block["rows"])
+        if not rows:
+            continue
+        previous = result[-1] if result else None
+        if previous is not None and previous["type"] == "table" and previous["rows"][0] == rows[0]:
+            previous["rows"] = previous["rows"] + rows[1:]
+        else:
+            result.append(dict(block, rows=rows))
+    return result
+
+
+def render_table(rows: List[List[str]], table_format: str = "markdown") -> str:
+    """
+    Serialize table rows (first row is the header)
+    
+    Args:
+        rows: Cell texts, row by row
+        table_format: "csv" or "markdown"
+    
+    Returns:
+        str: Serialized table
+    """
+    if not rows:
+        return ""
+    if table_format == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(rows)
+        return buffer.getvalue().rstrip("\n")
+    if table_format != "markdown":
+        raise ValueError(f"Unknown table format: {table_format} (expected one of {TABLE_FORMATS})")
+    
+    def line(row):
+        return "| " + " | ".join(" ".join(cell.split()).replace("|", "\\|") for cell in row) + " |"
+    
+    lines = [line(rows[0]), "|" + "---|" * len(rows[0])]
+    lines.extend(line(row) for row in rows[1:])
+    return "\n".join(lines)
+
+
+def cell_lines(rows: List[List[str]]) -> str:
+    """A table the way flat text extraction presents it: one line per cell"""
+    return "\n".join(cell for row in rows for cell in row if cell.strip())
+
+
+def table_token_report(blocks: List[Dict[str, Any]], counter, table_format: str = "csv") -> Dict[str, Any]:
+    """
+    Prompt tokens of a document's tables, one line per cell vs compact serialization
+    
+    Args:
+        blocks: Layout blocks as extracted (before compact_tables)
+        counter: TokenCounter for the consuming model (see document_processing.tokenization)
+        table_format: Compact format to compare against
+    
+    Returns:
+        dict: Table and cell counts, tokens as cell lines, as uncompacted markdown and
+            compacted, tokens saved and savings percentage (against cell lines)
+    """
+    raw = [block["rows"] for block in blocks if block["type"] == "table"]
+    compact = [block["rows"] for block in compact_tables(blocks) if block["type"] == "table"]
+    cell_line_tokens = sum(counter.count_raw(cell_lines(rows)) for rows in raw)
+    compact_tokens = sum(counter.count_raw(render_table(rows, table_format)) for rows in compact)
+    markdown_tokens = sum(counter.count_raw(render_table(rows, "markdown")) for rows in raw)
+    return {
+        "format": table_format,
+        "tables": len(raw),
+        "merged_tables": len(compact),
+        "cells": sum(len(row) for rows in raw for row in rows),
+        "cell_line_tokens": cell_line_tokens,
+        "markdown_tokens": markdown_tokens,
+        "compact_tokens": compact_tokens,
+        "tokens_saved": cell_line_tokens - compact_tokens,
+        "savings_pct": 100.0 * (cell_line_tokens - compact_tokens) / cell_line_tokens if cell_line_tokens else 0.0
+    }
@@ -0,0 +1,138 @@
+# Token counting for chunking and prompt budgeting
+import functools
+import os
+import sys
+from typing import Callable, List
+
+# Add parent directory to path to import the shared embedding model
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TokenCounter:
+    """
+    Counts tokens with a real tokenizer, caching counts per text
+    
+    Attributes:
+        name: Tokenizer description
+        max_tokens: Model sequence limit including special tokens (None if unbounded)
+        special_tokens: Tokens the model adds around every input (e.g. [CLS]/[SEP])
+    """
+    
+    def __init__(self, name: str, count_fn: Callable[[str], int], max_tokens: int = None,
+                 special_tokens: int = 0, cache_size: int = 65536):
+        """
+        Initialize the counter
+        
+        Args:
+            name: Tokenizer description
+            count_fn: Returns the number of tokens in a text, without special tokens
+            max_tokens: Model sequence limit including special tokens
+            special_tokens: Tokens added around every input
+            cache_size: Number of distinct texts whose counts are cached
+        """
+        self.name = name
+        self.max_tokens = max_tokens
+        self.special_tokens = special_tokens
+        self._count = functools.lru_cache(maxsize=cache_size)(count_fn)
+    
+    def count(self, text: str) -> int:
+        """Tokens the model sees for text, including special tokens"""
+        return self._count(text) + self.special_tokens
+    
+    def count_raw(self, text: str) -> int:
+        """Tokens in text alone, for summing pieces"""
+        return self._count(text)
+    
+    def cache_info(self):
+        """Hit/miss statistics of the per-text count cache"""
+        return self._count.cache_info()
+
+
+@functools.lru_cache(maxsize=None)
+def get_embedding_token_counter() -> TokenCounter:
+    """
+    Counter using the embedding model's own tokenizer
+    
+    max_tokens is the model's max_seq_length (384 for all-mpnet-base-v2);
+    anything longer is silently truncated by SentenceTransformer.encode.
+    """
+    from embedding.model_provider import MODEL_NAME, get_model
+    model = get_model()
+    tokenizer = model.tokenizer
+    return TokenCounter(
+        name=MODEL_NAME,
+        count_fn=lambda text: len(tokenizer.encode(text, add_special_tokens=False)),
+        max_tokens=model.max_seq_length,
+        special_tokens=tokenizer.num_special_tokens_to_add(pair=False)
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_token_counter(model: str = "gpt-4o") -> TokenCounter:
+    """
+    Counter for chat model prompts (tiktoken)
+    
+    Falls back to a 4-characters-per-token estimate when tiktoken is not installed.
+    
+    Args:
+        model: OpenAI model name used to pick the encoding
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        print("Warning: tiktoken not installed. Estimating LLM tokens as characters / 4.")
+        return TokenCounter(name="estimate", count_fn=lambda text: (len(text) + 3) // 4)
+    
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except KeyError:
+        encoding = tiktoken.get_encoding("o200k_base")
+    return TokenCounter(
+        name=encoding.name,
+        count_fn=lambda text: len(encoding.encode(text, disallowed_special=()))
+    )
+
+
+def pack_to_token_budget(chunks: List[str], budget: int, counter: TokenCounter, separator: str = "\n\n") -> str:
+    """
+    Join chunks in order until the token budget is reached
+    
+    The first chunk that does not fit is cut at a word boundary so the budget
+    is filled as far as possible; later chunks are dropped.
+    
+    Args:
+        chunks: Text chunks in document order
+        budget: Maximum tokens in the packed text
+        counter: Token counter for the target model
+        separator: Text placed between chunks
+        
+    Returns:
+        str: Packed text of at most `budget` tokens
+    """
+    packed = []
+    used = 0
+    separator_tokens = counter.count_raw(separator)
+    
+    for chunk in chunks:
+        extra = separator_tokens if packed else 0
+        chunk_tokens = counter.count_raw(chunk)
+        if used + extra + chunk_tokens <= budget:
+            packed.append(chunk)
+            used += extra + chunk_tokens
+            continue
+        
+        # Fill the remainder with a prefix of this chunk
+        remaining = budget - used - extra
+        words = chunk.split()
+        low, high = 0, len(words)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if counter.count_raw(" ".join(words[:mid])) <= remaining:
+                low = mid
+            else:
+                high = mid - 1
+        if low:
+            packed.append(" ".join(words[:low]))
+        break
+    
+    return separator.join(packed)
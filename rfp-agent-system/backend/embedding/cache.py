@@ -0,0 +1,202 @@
+# Persistent, content-addressed embedding cache (SQLite)
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+# Add parent directory to path to import config
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+class EmbeddingCache:
+    """
+    Embedding cache keyed by SHA-256 of (model name, chunk text)
+    
+    Vectors are stored as float32 blobs in a single SQLite file. When the
+    number of entries exceeds max_entries, the least recently used ones are
+    evicted. Hit/miss counters cover the lifetime of this instance.
+    """
+    
+    def __init__(self, path: str = None, max_entries: int = None):
+        """
+        Open (or create) the cache file
+        
+        Args:
+            path: SQLite file path (default: config.EMBEDDING_CACHE_PATH)
+            max_entries: Maximum cached vectors (default: config.EMBEDDING_CACHE_MAX_ENTRIES)
+        """
+        self.path = path or config.EMBEDDING_CACHE_PATH
+        self.max_entries = max_entries or config.EMBEDDING_CACHE_MAX_ENTRIES
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+        self._conn.commit()
+    
+    @staticmethod
+    def make_key(text: str, model_name: str) -> str:
+        """Content address of a chunk for a given model"""
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+    
+    def get_many(self, texts: List[str], model_name: str) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached vectors
+        
+        Args:
+            texts: Chunk texts
+            model_name: Embedding model name
+        
+        Returns:
+            One float32 vector per text, or None where the text is not cached
+        """
+        keys = [self.make_key(text, model_name) for text in texts]
+        found = {}
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+            
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        
+        return [
+            np.frombuffer(found[key], dtype=np.float32).copy() if key in found else None
+            for key in keys
+        ]
+    
+    def put_many(self, texts: List[str], model_name: str, vectors) -> None:
+        """
+        Store vectors, evicting least recently used entries beyond max_entries
+        
+        Args:
+            texts: Chunk texts
+            model_name: Embedding model name
+            vectors: One vector per text
+        """
+        now = time.time()
+        rows = [
+            (self.make_key(text, model_name), np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)", rows
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                self.evictions += excess
+            self._conn.commit()
+    
+    def clear(self) -> None:
+        """Remove every cached vector"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+    
+    def get_stats(self) -> dict:
+        """
+        Get cache statistics
+        
+        Returns:
+            dict: Entry count, file size, and hit/miss/eviction counters
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "size_mb": os.path.getsize(self.path) / (1024 * 1024) if os.path.exists(self.path) else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Process-wide cache instance, or None when EMBEDDING_CACHE_ENABLED is false
+    """
+    global _cache
+    if not config.EMBEDDING_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+
+def cached_encode(texts: List[str], model_name: str, encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+    """
+    Embed texts, running the model only for texts missing from the cache
+    
+    Args:
+        texts: Texts to embed
+        model_name: Embedding model name (part of the cache key)
+        encode: Function that embeds a list of texts into a (n x dim) array
+    
+    Returns:
+        np.ndarray: (n x dim) float32 embeddings in input order
+    """
+    cache = get_embedding_cache()
+    if cache is None:
+        return np.asarray(encode(texts), dtype=np.float32)
+    
+    vectors = cache.get_many(texts, model_name)
+    
+    # Encode each distinct missing text once
+    missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+    if missing:
+        encoded = np.asarray(encode(missing), dtype=np.float32)
+        cache.put_many(missing, model_name, encoded)
+        by_text = dict(zip(missing, encoded))
+        vectors = [by_text[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+    
+    if not vectors:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.stack(vectors)
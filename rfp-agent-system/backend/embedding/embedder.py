@@ -1,10 +1,8 @@
 # Embedding generation module
-from sentence_transformers import SentenceTransformer
 from typing import List, Union
 import numpy as np
-
-# Initialize the embedding model (all-mpnet-base-v2 produces 768-dimensional embeddings)
-model = SentenceTransformer('all-mpnet-base-v2')
+from embedding.cache import cached_encode
+from embedding.model_provider import MODEL_NAME, get_model
 
 
 def generate_embedding(text: str) -> List[float]:
@@ -17,7 +15,7 @@ def generate_embedding(text: str) -> List[float]:
     Returns:
         List[float]: 768-dimensional embedding vector
     """
-    embedding = model.encode(text, convert_to_numpy=True)
+    embedding = cached_encode([text], MODEL_NAME, lambda texts: get_model().encode(texts, convert_to_numpy=True))[0]
     return embedding.tolist()
 
 
@@ -37,6 +35,7 @@ def embed(text: str) -> List[float]:
 def embed_batch(texts: List[str], batch_size: int = 32) -> List[List[float]]:
     """
     Generate embeddings for multiple texts efficiently
+    Texts already in the embedding cache are not re-encoded
     
     Args:
         texts: List of text strings to embed
@@ -45,7 +44,12 @@ def embed_batch(texts: List[str], batch_size: int = 32) -> List[List[float]]:
     Returns:
         List of embedding vectors
     """
-    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    if not texts:
+        return []
+    embeddings = cached_encode(
+        texts, MODEL_NAME,
+        lambda missing: get_model().encode(missing, batch_size=batch_size, convert_to_numpy=True)
+    )
     return [emb.tolist() for emb in embeddings]
 
 
@@ -76,7 +80,7 @@ def get_model_info() -> dict:
         dict: Model name and dimensions
     """
     return {
-        "model_name": "all-mpnet-base-v2",
+        "model_name": MODEL_NAME,
         "dimensions": 768,
         "max_sequence_length": 384
     }
@@ -0,0 +1,43 @@
+# Lazily-loaded, process-wide embedding model
+import threading
+
+# all-mpnet-base-v2 produces 768-dimensional embeddings
+MODEL_NAME = "all-mpnet-base-v2"
+
+_models = {}
+_lock = threading.Lock()
+
+
+def get_model(model_name: str = MODEL_NAME):
+    """
+    Return the shared SentenceTransformer, loading it on first use
+    
+    sentence_transformers (and torch) are imported here rather than at module
+    import time, so importing the embedding modules stays cheap.
+    
+    Args:
+        model_name: SentenceTransformer model name
+        
+    Returns:
+        SentenceTransformer: The process-wide model instance
+    """
+    model = _models.get(model_name)
+    if model is None:
+        with _lock:
+            model = _models.get(model_name)
+            if model is None:
+                from sentence_transformers import SentenceTransformer
+                print(f"Loading embedding model {model_name}...")
+                model = SentenceTransformer(model_name)
+                _models[model_name] = model
+    return model
+
+
+def prewarm(model_name: str = MODEL_NAME) -> None:
+    """Load the model ahead of the first request"""
+    get_model(model_name)
+
+
+def is_loaded(model_name: str = MODEL_NAME) -> bool:
+    """Whether the model has already been loaded in this process"""
+    return model_name in _models
@@ -73,9 +73,10 @@ def process_rfp(req: func.HttpRequest) -> func.HttpResponse:
                 # Import here to avoid cold start issues
                 from pipeline import process_rfp_document
                 from orchestrator import save_to_kb
+                from storage_clients import run_sync
                 
                 # Process the document
-                results = process_rfp_document(file_path=tmp_path)
+                results = run_sync(process_rfp_document(file_path=tmp_path))
                 
                 # Generate KB content from results
                 kb_content = generate_kb_content(results)
@@ -104,9 +105,10 @@ def process_rfp(req: func.HttpRequest) -> func.HttpResponse:
             
             if blob_name:
                 from pipeline import process_rfp_document
+                from storage_clients import run_sync
                 
                 # Process from blob
-                results = process_rfp_document(blob_name=blob_name)
+                results = run_sync(process_rfp_document(blob_name=blob_name))
                 
                 # Read generated KB
                 kb_path = Path(__file__).parent / "kb.md"
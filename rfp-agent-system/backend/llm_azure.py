@@ -2,6 +2,7 @@
 from openai import AzureOpenAI
 import os
 from typing import Optional
+import threading
 import time
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
@@ -54,7 +55,8 @@ class AzureOpenAIClient:
         self.temperature = temperature
         self.max_tokens = max_tokens
         
-        # Cost tracking
+        # Cost tracking (generate may be called from several threads at once)
+        self._stats_lock = threading.Lock()
         self.total_input_tokens = 0
         self.total_output_tokens = 0
         self.total_cost = 0.0
@@ -111,14 +113,15 @@ class AzureOpenAIClient:
                 
                 # Track usage
                 usage = response.usage
-                self.total_input_tokens += usage.prompt_tokens
-                self.total_output_tokens += usage.completion_tokens
                 
                 # Calculate cost
                 input_cost = (usage.prompt_tokens / 1000) * self.input_cost_per_1k
                 output_cost = (usage.completion_tokens / 1000) * self.output_cost_per_1k
                 call_cost = input_cost + output_cost
-                self.total_cost += call_cost
+                with self._stats_lock:
+                    self.total_input_tokens += usage.prompt_tokens
+                    self.total_output_tokens += usage.completion_tokens
+                    self.total_cost += call_cost
                 
                 logger.info(
                     f"Azure OpenAI call completed - "
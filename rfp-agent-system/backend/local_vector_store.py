@@ -1,39 +1,490 @@
 # Simple local vector search without database
 import json
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Hashable
 import os
-from embedding.embedder import generate_embedding, compute_similarity
+import threading
+from embedding.embedder import generate_embedding, embed_batch
+from document_processing.chunk_store import ChunkRef, PackedChunkStore
+
+# One write lock per store directory, shared by every LocalVectorStore instance in the process
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length so dot products become cosine similarities"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the top_k highest scores, best first
+    
+    Uses argpartition so only the selected candidates are sorted.
+    """
+    top_k = min(top_k, scores.shape[-1])
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < scores.shape[-1]:
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(scores.shape[-1])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def _nearest_centroids(data: np.ndarray, centroids: np.ndarray, block_size: int = 8192) -> np.ndarray:
+    """Index of the closest centroid (squared L2) for every row, computed in blocks"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    assignments = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), block_size):
+        block = np.asarray(data[start:start + block_size], dtype=np.float32)
+        distances = centroid_norms - 2.0 * (block @ centroids.T)
+        assignments[start:start + len(block)] = distances.argmin(axis=1)
+    return assignments
+
+
+def kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Plain Lloyd's k-means on float32 rows
+    
+    Args:
+        data: (n x d) training vectors
+        k: Number of centroids (clipped to n)
+        iterations: Number of assignment/update rounds
+        seed: Random seed for the initial centroids
+    
+    Returns:
+        np.ndarray: (k x d) float32 centroids
+    """
+    data = np.asarray(data, dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    
+    for _ in range(iterations):
+        assignments = _nearest_centroids(data, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=k)
+        occupied = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[occupied]
+        centroids[occupied] = np.add.reduceat(data[order], starts, axis=0) / counts[occupied, None]
+        
+        # Re-seed empty clusters from random points
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    
+    return centroids
+
+
+class IVFPQIndex:
+    """
+    Approximate nearest-neighbour index: inverted file + product quantization (IVF-PQ)
+    
+    Pure numpy, CPU only. Vectors are expected to be unit length, so the
+    inner product is the cosine similarity.
+    
+    - Every vector is assigned to the nearest of `nlist` coarse centroids.
+    - The residual (vector - centroid) is split into `m` sub-vectors and each
+      one is stored as a single byte (the id of its nearest sub-codebook entry).
+    - A query scores only the `nprobe` closest lists, using per-query lookup
+      tables, and returns the best `rerank` candidates for exact rescoring.
+    
+    Raising `nprobe` and `rerank` increases recall at the cost of latency.
+    """
+    
+    def __init__(self, dim: int, nlist: int = None, m: int = 16, nprobe: int = 8,
+                 rerank: int = 100, kmeans_iterations: int = 20, seed: int = 0):
+        """
+        Initialize an untrained index
+        
+        Args:
+            dim: Vector dimension (must be divisible by m)
+            nlist: Number of coarse lists (default: 4 * sqrt(n) at training time)
+            m: Number of PQ sub-quantizers (bytes per stored vector)
+            nprobe: Lists scanned per query
+            rerank: Candidates returned for exact rescoring
+            kmeans_iterations: Training iterations for both quantizers
+            seed: Random seed for training
+        """
+        if dim % m != 0:
+            raise ValueError(f"Dimension {dim} is not divisible by m={m}")
+        self.dim = dim
+        self.nlist = nlist
+        self.m = m
+        self.nprobe = nprobe
+        self.rerank = rerank
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        
+        self.centroids = None   # (nlist x dim)
+        self.codebooks = None   # (m x ksub x dim/m)
+        self.assignments = np.empty(0, dtype=np.int32)
+        self.codes = np.empty((0, m), dtype=np.uint8)
+        self._lists = None
+    
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+    
+    @property
+    def ntotal(self) -> int:
+        return len(self.assignments)
+    
+    def train(self, vectors: np.ndarray, max_training_rows: int = 50000):
+        """
+        Learn the coarse centroids and PQ codebooks
+        
+        Args:
+            vectors: (n x dim) unit-length training vectors
+            max_training_rows: Random sample size used for training
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        rng = np.random.default_rng(self.seed)
+        if len(vectors) > max_training_rows:
+            vectors = vectors[rng.choice(len(vectors), max_training_rows, replace=False)]
+        
+        nlist = self.nlist or max(1, int(4 * np.sqrt(len(vectors))))
+        self.centroids = kmeans(vectors, nlist, self.kmeans_iterations, self.seed)
+        self.nlist = len(self.centroids)
+        
+        residuals = vectors - self.centroids[_nearest_centroids(vectors, self.centroids)]
+        sub_dim = self.dim // self.m
+        ksub = min(256, len(vectors))
+        self.codebooks = np.stack([
+            kmeans(residuals[:, j * sub_dim:(j + 1) * sub_dim], ksub, self.kmeans_iterations, self.seed + j)
+            for j in range(self.m)
+        ])
+    
+    def add(self, vectors: np.ndarray):
+        """
+        Encode and append vectors; row ids continue from ntotal
+        
+        Args:
+            vectors: (n x dim) unit-length vectors
+        """
+        if not self.is_trained:
+            raise RuntimeError("IVFPQIndex must be trained before adding vectors")
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        if not len(vectors):
+            return
+        
+        assignments = _nearest_centroids(vectors, self.centroids)
+        residuals = vectors - self.centroids[assignments]
+        sub_dim = self.dim // self.m
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = _nearest_centroids(residuals[:, j * sub_dim:(j + 1) * sub_dim], self.codebooks[j])
+        
+        self.assignments = np.concatenate([self.assignments, assignments])
+        self.codes = np.concatenate([self.codes, codes])
+        self._lists = None
+    
+    def truncate(self, rows: int):
+        """Drop every vector with id >= rows"""
+        self.assignments = self.assignments[:rows]
+        self.codes = self.codes[:rows]
+        self._lists = None
+    
+    def keep(self, rows: np.ndarray):
+        """Keep only the given ids (ascending); they are renumbered 0..len(rows)-1"""
+        self.assignments = self.assignments[rows]
+        self.codes = self.codes[rows]
+        self._lists = None
+    
+    def search(self, query: np.ndarray, k: int) -> np.ndarray:
+        """
+        Approximate search for one unit-length query
+        
+        Args:
+            query: (dim,) query vector
+            k: Minimum number of candidates wanted
+        
+        Returns:
+            np.ndarray: Up to max(k, rerank) candidate row ids, best approximate score first
+        """
+        if not self.ntotal:
+            return np.empty(0, dtype=np.int64)
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        
+        coarse_scores = self.centroids @ query
+        probe = top_k_indices(coarse_scores, self.nprobe)
+        ids = np.concatenate([self._inverted_lists()[c] for c in probe])
+        if not len(ids):
+            return ids
+        
+        # Lookup table: inner product of each query sub-vector with every codebook entry
+        lookup = np.einsum("md,mkd->mk", query.reshape(self.m, -1), self.codebooks)
+        scores = coarse_scores[self.assignments[ids]] + lookup[np.arange(self.m), self.codes[ids]].sum(axis=1)
+        return ids[top_k_indices(scores, max(k, self.rerank))]
+    
+    def save(self, path: str):
+        """Persist the trained quantizers and encoded vectors"""
+        tmp_path = path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            centroids=self.centroids,
+            codebooks=self.codebooks,
+            assignments=self.assignments,
+            codes=self.codes,
+            params=np.array([self.dim, self.nlist, self.m, self.nprobe, self.rerank,
+                             self.kmeans_iterations, self.seed], dtype=np.int64)
+        )
+        os.replace(tmp_path, path)
+    
+    @classmethod
+    def load(cls, path: str) -> "IVFPQIndex":
+        """Load an index written by save()"""
+        with np.load(path) as data:
+            dim, nlist, m, nprobe, rerank, iterations, seed = (int(v) for v in data["params"])
+            index = cls(dim, nlist=nlist, m=m, nprobe=nprobe, rerank=rerank,
+                        kmeans_iterations=iterations, seed=seed)
+            index.centroids = data["centroids"]
+            index.codebooks = data["codebooks"]
+            index.assignments = data["assignments"]
+            index.codes = data["codes"]
+        return index
+    
+    def _inverted_lists(self) -> List[np.ndarray]:
+        """Row ids grouped by coarse list, rebuilt lazily after inserts"""
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.cumsum(np.bincount(self.assignments, minlength=self.nlist))[:-1]
+            self._lists = np.split(order, bounds)
+        return self._lists
+
+
+class QuantizedMatrix:
+    """
+    Compact in-memory copy of unit-length embeddings for first-pass scoring
+    
+    - float16: 2 bytes per dimension
+    - int8: 1 byte per dimension plus one float32 scale per row
+      (each row is scaled so its largest component maps to 127)
+    
+    Scores are approximate; the store rescores the best candidates from the
+    full-precision vectors on disk.
+    """
+    
+    MODES = ("float16", "int8")
+    
+    def __init__(self, mode: str, dim: int):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown quantization mode: {mode} (expected one of {self.MODES})")
+        self.mode = mode
+        self.dim = dim
+        self.data = np.empty((0, dim), dtype=np.float16 if mode == "float16" else np.int8)
+        self.scales = np.empty(0, dtype=np.float32)
+    
+    @classmethod
+    def from_vectors(cls, mode: str, vectors: np.ndarray, block_size: int = 16384) -> "QuantizedMatrix":
+        """
+        Quantize a (possibly memory-mapped) matrix block by block
+        
+        Args:
+            mode: "float16" or "int8"
+            vectors: (n x dim) raw embeddings; rows are normalized here
+            block_size: Rows converted per step, bounding the float32 working set
+        
+        Returns:
+            QuantizedMatrix: The compact copy
+        """
+        matrix = cls(mode, vectors.shape[1])
+        matrix.data = np.empty(vectors.shape, dtype=matrix.data.dtype)
+        matrix.scales = np.empty(len(vectors), dtype=np.float32)
+        for start in range(0, len(vectors), block_size):
+            data, scales = matrix._encode(normalize_rows(vectors[start:start + block_size]))
+            matrix.data[start:start + len(data)] = data
+            matrix.scales[start:start + len(data)] = scales
+        return matrix
+    
+    def add(self, vectors: np.ndarray):
+        """Append unit-length rows"""
+        data, scales = self._encode(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        self.data = np.concatenate([self.data, data])
+        self.scales = np.concatenate([self.scales, scales])
+    
+    def keep(self, rows: np.ndarray):
+        """Keep only the given rows (ascending)"""
+        self.data = self.data[rows]
+        self.scales = self.scales[rows]
+    
+    def scores(self, queries: np.ndarray, block_size: int = 16384) -> np.ndarray:
+        """
+        Approximate inner products with one query (dim,) or several (q x dim)
+        
+        Returns:
+            np.ndarray: (n,) or (n x q) float32 scores
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        result = np.empty((len(self.data),) + queries.shape[:-1], dtype=np.float32)
+        for start in range(0, len(self.data), block_size):
+            block = self.data[start:start + block_size].astype(np.float32) @ queries.T
+            if self.mode == "int8":
+                block *= self.scales[start:start + block_size].reshape((-1,) + (1,) * (block.ndim - 1))
+            result[start:start + len(block)] = block
+        return result
+    
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + (self.scales.nbytes if self.mode == "int8" else 0)
+    
+    def _encode(self, vectors: np.ndarray):
+        """Quantize unit-length rows into (data, per-row scales)"""
+        if self.mode == "float16":
+            return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+        scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
 
 
 class LocalVectorStore:
     """
     Simple file-based vector storage - no database needed
-    Stores embeddings as JSON files
+    
+    On-disk layout (storage_dir):
+        manifest.json   - format version, embedding dimension and row count
+        embeddings.f32  - raw float32 matrix (rows x dim), opened with np.memmap
+        chunks.jsonl    - one {"text", "metadata"} record per row; chunks added as
+                          ChunkRef store {"ref": [doc_id, offset, length]} instead
+                          and are read from the PackedChunkStore on demand
+        ann_ivfpq.npz   - optional IVF-PQ approximate index (see IVFPQIndex)
+    
+    With quantization="float16" or "int8", searches score a compact in-memory
+    copy of the vectors (see QuantizedMatrix) and rescore the best
+    rescore_candidates rows exactly from embeddings.f32.
+    
+    Searches can be restricted by metadata, e.g. filter={"filename": "rfp.pdf"}.
+    Rows are looked up in an in-memory metadata index (built per field on first
+    use) and only those rows are read and scored, so per-document searches do
+    not slow down as other documents are added.
+    
+    A legacy index.json found in storage_dir is migrated on first load.
     """
     
-    def __init__(self, storage_dir="data/embeddings"):
+    FORMAT_VERSION = 2
+    DTYPE = np.float32
+    
+    # Below this many chunks an exact scan is fast enough that the ANN index is not built
+    ANN_MIN_ROWS = 5000
+    
+    # Rows inserted into the ANN index before it is re-saved; rows not yet saved are
+    # re-encoded from the embeddings when the store is next loaded
+    ANN_SAVE_ROWS = 1000
+    
+    def __init__(self, storage_dir="data/embeddings", use_ann: bool = False, ann_params: Dict[str, Any] = None,
+                 quantization: str = None, rescore_candidates: int = 100,
+                 chunk_store: PackedChunkStore = None):
+        """
+        Open (or create) a store
+        
+        Args:
+            storage_dir: Directory holding the store files
+            use_ann: Answer searches from the IVF-PQ index once the store has ANN_MIN_ROWS chunks
+            ann_params: IVFPQIndex settings (nlist, m, nprobe, rerank); nprobe and rerank
+                also override the values saved with an existing index
+            quantization: None (float32), "float16" or "int8" for the in-memory search copy
+            rescore_candidates: Candidates rescored at full precision when quantization is set
+            chunk_store: Where ChunkRef texts are read from (default: PackedChunkStore("data/chunks"))
+        """
+        if quantization not in (None, "float32") + QuantizedMatrix.MODES:
+            raise ValueError(f"Unknown quantization mode: {quantization}")
         self.storage_dir = storage_dir
+        self.use_ann = use_ann
+        self.ann_params = ann_params or {}
+        self.quantization = None if quantization == "float32" else quantization
+        self.rescore_candidates = rescore_candidates
+        self._chunk_store = chunk_store
         os.makedirs(storage_dir, exist_ok=True)
-        self.index_file = os.path.join(storage_dir, "index.json")
+        self.index_file = os.path.join(storage_dir, "index.json")  # legacy JSON format
+        self.manifest_file = os.path.join(storage_dir, "manifest.json")
+        self.embeddings_file = os.path.join(storage_dir, "embeddings.f32")
+        self.chunks_file = os.path.join(storage_dir, "chunks.jsonl")
+        self.ann_file = os.path.join(storage_dir, "ann_ivfpq.npz")
         self.load_index()
     
     def load_index(self):
         """Load the index from file"""
-        if os.path.exists(self.index_file):
-            with open(self.index_file, 'r') as f:
-                self.index = json.load(f)
-        else:
-            self.index = {
-                "chunks": [],
-                "embeddings": [],
-                "metadata": []
-            }
+        if not os.path.exists(self.manifest_file) and os.path.exists(self.index_file):
+            self._migrate_legacy_index()
+            return
+        
+        self.chunks = []
+        self.metadata = []
+        self.dim = None
+        self.ann_index = None
+        self._ann_unsaved = 0
+        self._field_indexes = {}
+        self._invalidate_caches()
+        
+        if not os.path.exists(self.manifest_file):
+            return
+        
+        with open(self.manifest_file, 'r') as f:
+            manifest = json.load(f)
+        self.dim = manifest.get("dim")
+        
+        if os.path.exists(self.chunks_file):
+            with open(self.chunks_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    self.chunks.append(ChunkRef(*record["ref"]) if "ref" in record else record["text"])
+                    self.metadata.append(record.get("metadata", {}))
+        
+        # A crash between the two appends can leave one file a row ahead; keep the common prefix
+        rows = self._stored_rows()
+        if len(self.chunks) != rows:
+            del self.chunks[rows:]
+            del self.metadata[rows:]
+            self.save_index()
+        
+        self._load_ann_index()
     
     def save_index(self):
-        """Save the index to file"""
-        with open(self.index_file, 'w') as f:
-            json.dump(self.index, f)
+        """Rewrite all files from the in-memory state"""
+        matrix = np.asarray(self.embeddings, dtype=self.DTYPE) if self.chunks else None
+        if matrix is not None:
+            matrix = matrix.copy()  # detach from the memmap we are about to overwrite
+        self._invalidate_caches()
+        self._field_indexes = {}
+        self._write_files(matrix)
+        
+        if self.ann_index is not None:
+            self.ann_index.truncate(len(self.chunks))
+            self._save_ann_index()
+    
+    def flush(self):
+        """Persist ANN index rows inserted since its last save (see ANN_SAVE_ROWS)"""
+        if self.ann_index is not None and self._ann_unsaved:
+            self._save_ann_index()
+    
+    def write_lock(self) -> threading.RLock:
+        """
+        Process-wide lock for this store's directory
+        
+        add_chunks and delete_rows take it themselves; callers that plan writes
+        from the loaded rows hold it from load_index through the writes.
+        """
+        key = os.path.realpath(self.storage_dir)
+        with _write_locks_guard:
+            return _write_locks.setdefault(key, threading.RLock())
+    
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Stored embeddings as a read-only (rows x dim) float32 memmap"""
+        if self._embeddings is None:
+            rows = len(self.chunks)
+            if rows == 0 or not self.dim:
+                return np.empty((0, self.dim or 0), dtype=self.DTYPE)
+            self._embeddings = np.memmap(
+                self.embeddings_file, dtype=self.DTYPE, mode='r', shape=(rows, self.dim)
+            )
+        return self._embeddings
     
     def add_chunk(self, text: str, embedding: List[float], metadata: Dict[str, Any] = None):
         """
@@ -44,61 +495,664 @@ class LocalVectorStore:
             embedding: 768-dim embedding vector
             metadata: Optional metadata (filename, chunk_id, etc.)
         """
-        self.index["chunks"].append(text)
-        self.index["embeddings"].append(embedding)
-        self.index["metadata"].append(metadata or {})
-        self.save_index()
+        self.add_chunks([text], [embedding], [metadata])
     
-    def search_similar(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def add_chunks(self, texts: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]] = None):
+        """
+        Add many chunks at once, appending to the store files in a single write each
+        
+        Args:
+            texts: The text chunks, or ChunkRefs into the PackedChunkStore
+            embeddings: One 768-dim embedding vector per chunk
+            metadatas: Optional metadata per chunk (filename, chunk_id, etc.)
+        """
+        if len(texts) != len(embeddings):
+            raise ValueError("texts and embeddings must have the same length")
+        if not texts:
+            return
+        if metadatas is None:
+            metadatas = [{}] * len(texts)
+        
+        matrix = np.asarray(embeddings, dtype=self.DTYPE).reshape(len(texts), -1)
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dim embeddings, got {matrix.shape[1]}")
+        
+        records = [m or {} for m in metadatas]
+        
+        with self.write_lock():
+            self._check_unchanged_on_disk()
+            # Append-only: embeddings first, so a partial write never exposes a text without a vector
+            quantized = self._quantized
+            self._invalidate_caches()
+            with open(self.embeddings_file, 'ab') as f:
+                f.write(matrix.tobytes())
+            with open(self.chunks_file, 'a', encoding='utf-8') as f:
+                f.write("".join(
+                    self._record(text, meta)
+                    for text, meta in zip(texts, records)
+                ))
+            
+            first_row = len(self.chunks)
+            self.chunks.extend(texts)
+            self.metadata.extend(records)
+            self._write_manifest()
+        self._index_metadata(records, first_row)
+        
+        if quantized is not None:
+            quantized.add(normalize_rows(matrix))
+            self._quantized = quantized
+        
+        # Incremental insert: encode only the new rows with the already trained quantizers;
+        # the index file is rewritten once ANN_SAVE_ROWS rows have accumulated, not on every call
+        if self.ann_index is not None:
+            self.ann_index.add(normalize_rows(matrix))
+            self._ann_unsaved += len(texts)
+            if self._ann_unsaved >= self.ANN_SAVE_ROWS:
+                self._save_ann_index()
+    
+    @property
+    def normalized_embeddings(self) -> np.ndarray:
+        """Unit-length float32 copy of the embeddings, kept in memory for scoring"""
+        if self._normalized is None:
+            self._normalized = normalize_rows(self.embeddings)
+        return self._normalized
+    
+    @property
+    def quantized_embeddings(self) -> QuantizedMatrix:
+        """Compact search copy used when quantization is enabled"""
+        if self._quantized is None:
+            self._quantized = QuantizedMatrix.from_vectors(self.quantization, self.embeddings)
+        return self._quantized
+    
+    def search_similar(self, query: str, top_k: int = 5, filter: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
         Search for similar chunks
         
         Args:
             query: Search query text
             top_k: Number of results to return
-            
+            filter: Optional metadata filter, e.g. {"filename": "rfp.pdf"}
+        
         Returns:
             List of similar chunks with scores
         """
-        if not self.index["chunks"]:
+        if not self.chunks:
             return []
         
         # Generate embedding for query
         query_embedding = generate_embedding(query)
+        return self.search_by_embedding(query_embedding, top_k, filter=filter)
+    
+    def search_similar_batch(self, queries: List[str], top_k: int = 5,
+                             filter: Dict[str, Any] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Search for several queries at once with a single matrix product
         
-        # Calculate similarities
-        similarities = []
-        for i, stored_embedding in enumerate(self.index["embeddings"]):
-            similarity = compute_similarity(query_embedding, stored_embedding)
-            similarities.append({
-                "chunk": self.index["chunks"][i],
-                "metadata": self.index["metadata"][i],
-                "score": similarity
-            })
+        Args:
+            queries: Search query texts
+            top_k: Number of results to return per query
+            filter: Optional metadata filter, e.g. {"filename": "rfp.pdf"}
+        
+        Returns:
+            One list of similar chunks with scores per query, in query order
+        """
+        if not self.chunks or not queries:
+            return [[] for _ in queries]
+        
+        query_matrix = normalize_rows(embed_batch(queries))
+        if filter:
+            rows = self.filter_rows(filter)
+            scores = self._partition_scores(rows, query_matrix).T
+            return [self._results(*self._top_partition_rows(rows, row, top_k)) for row in scores]
+        
+        if self._ann_ready():
+            return [self._search_ann(query_vector, top_k) for query_vector in query_matrix]
+        
+        if self.quantization:
+            scores = self.quantized_embeddings.scores(query_matrix).T
+            return [
+                self._results(*self._rescore_top(row, query_vector, top_k))
+                for row, query_vector in zip(scores, query_matrix)
+            ]
+        
+        scores = query_matrix @ self.normalized_embeddings.T
+        return [self._results(*self._top_rows(row, top_k)) for row in scores]
+    
+    def search_by_embedding(self, query_embedding: List[float], top_k: int = 5, exact: bool = False,
+                            filter: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Search for chunks similar to an already computed query embedding
+        
+        Args:
+            query_embedding: Query vector with the store's dimension
+            top_k: Number of results to return
+            exact: Force a full scan even when the ANN index is enabled
+            filter: Optional metadata filter, e.g. {"filename": "rfp.pdf"}; only the
+                matching rows are scored (exactly, without the ANN index)
+        
+        Returns:
+            List of similar chunks with cosine similarity scores, best first
+        """
+        if not self.chunks:
+            return []
+        
+        query_vector = normalize_rows(query_embedding)
+        if filter:
+            rows = self.filter_rows(filter)
+            return self._results(*self._top_partition_rows(rows, self._partition_scores(rows, query_vector), top_k))
+        
+        if not exact and self._ann_ready():
+            return self._search_ann(query_vector, top_k)
+        
+        if self.quantization:
+            scores = self.quantized_embeddings.scores(query_vector)
+            return self._results(*self._rescore_top(scores, query_vector, top_k))
+        
+        # Cosine similarity against every chunk in one matrix-vector product
+        scores = self.normalized_embeddings @ query_vector
+        return self._results(*self._top_rows(scores, top_k))
+    
+    def filter_rows(self, filter: Dict[str, Any]) -> np.ndarray:
+        """
+        Row ids whose metadata matches every field of the filter
+        
+        Args:
+            filter: {field: value}; a list, tuple or set value matches any of its items
+        
+        Returns:
+            np.ndarray: Matching row ids, ascending
+        """
+        rows = None
+        for field, wanted in filter.items():
+            index = self._metadata_index(field)
+            values = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            matched = [index[value] for value in values if value in index]
+            matched = np.unique(np.concatenate(matched)) if matched else np.empty(0, dtype=np.int64)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+        return rows if rows is not None else np.arange(len(self.chunks))
+    
+    def list_documents(self) -> Dict[str, int]:
+        """Chunk count per stored filename"""
+        return {filename: len(rows) for filename, rows in self._metadata_index("filename").items()}
+    
+    def delete_document(self, filename: str) -> int:
+        """
+        Remove every chunk of a document
+        
+        Args:
+            filename: Value of the "filename" metadata the chunks were added with
+        
+        Returns:
+            int: Number of chunks removed
+        """
+        return self.delete_where({"filename": filename})
+    
+    def delete_where(self, filter: Dict[str, Any]) -> int:
+        """
+        Remove every chunk whose metadata matches the filter
+        
+        The remaining rows are compacted and renumbered; the in-memory search
+        copies and the ANN index are remapped rather than rebuilt. Packed chunk
+        files no longer referenced by any row are deleted from the chunk store.
+        
+        Args:
+            filter: Metadata filter (see filter_rows)
+        
+        Returns:
+            int: Number of chunks removed
+        """
+        return self.delete_rows(self.filter_rows(filter) if self.chunks else np.empty(0, dtype=np.int64))
+    
+    def delete_rows(self, rows) -> int:
+        """
+        Remove chunks by row id (see delete_where)
+        
+        Args:
+            rows: Row ids to remove
+        
+        Returns:
+            int: Number of chunks removed
+        """
+        removed = np.unique(np.asarray(rows, dtype=np.int64))
+        if not len(removed):
+            return 0
+        
+        with self.write_lock():
+            self._check_unchanged_on_disk()
+            keep = np.ones(len(self.chunks), dtype=bool)
+            keep[removed] = False
+            kept_rows = np.flatnonzero(keep)
+            removed_docs = {self.chunks[i].doc_id for i in removed if isinstance(self.chunks[i], ChunkRef)}
+            
+            matrix = np.asarray(self.embeddings[kept_rows], dtype=self.DTYPE)
+            normalized, quantized = self._normalized, self._quantized
+            self._invalidate_caches()
+            self.chunks = [self.chunks[i] for i in kept_rows]
+            self.metadata = [self.metadata[i] for i in kept_rows]
+            self._field_indexes = {}
+            self._write_files(matrix if len(kept_rows) else None)
+        
+        if normalized is not None:
+            self._normalized = normalized[kept_rows]
+        if quantized is not None:
+            quantized.keep(kept_rows)
+            self._quantized = quantized
+        if self.ann_index is not None:
+            self.ann_index.keep(kept_rows)
+            self._save_ann_index()
         
-        # Sort by similarity and return top_k
-        similarities.sort(key=lambda x: x["score"], reverse=True)
-        return similarities[:top_k]
+        removed_docs -= {chunk.doc_id for chunk in self.chunks if isinstance(chunk, ChunkRef)}
+        for doc_id in removed_docs:
+            self.chunk_store.delete_document(doc_id)
+        
+        return len(removed)
+    
+    def build_ann_index(self, **params) -> IVFPQIndex:
+        """
+        Train the IVF-PQ index on every stored chunk and persist it
+        
+        Later add_chunk/add_chunks calls insert into it incrementally.
+        
+        Args:
+            **params: IVFPQIndex settings, overriding the store's ann_params
+        
+        Returns:
+            IVFPQIndex: The trained index
+        """
+        if not self.chunks:
+            raise ValueError("Cannot build an ANN index on an empty store")
+        
+        print(f"Building IVF-PQ index over {len(self.chunks)} chunks...")
+        index = IVFPQIndex(self.dim, **{**self.ann_params, **params})
+        # Quantized stores avoid keeping a full float32 copy around after the build
+        vectors = normalize_rows(self.embeddings) if self.quantization else self.normalized_embeddings
+        index.train(vectors)
+        index.add(vectors)
+        self.ann_index = index
+        self._save_ann_index()
+        print(f"✓ ANN index built: {index.nlist} lists, {index.m} bytes/vector")
+        return index
+    
+    def _ann_ready(self) -> bool:
+        """Whether searches should go through the ANN index, building it on first need"""
+        if not self.use_ann:
+            return False
+        if self.ann_index is None and len(self.chunks) >= self.ANN_MIN_ROWS:
+            self.build_ann_index()
+        return self.ann_index is not None
+    
+    def _search_ann(self, query_vector: np.ndarray, top_k: int) -> List[Dict[str, Any]]:
+        """IVF-PQ candidate search followed by exact rescoring of the candidates"""
+        return self._results(*self._ann_rows(query_vector, top_k))
+    
+    def _ann_rows(self, query_vector: np.ndarray, top_k: int):
+        """Row ids and exact scores of the top_k ANN candidates"""
+        candidates = self.ann_index.search(query_vector, top_k)
+        exact_scores = self._exact_scores(candidates, query_vector)
+        best = top_k_indices(exact_scores, top_k)
+        return candidates[best], exact_scores[best]
+    
+    @staticmethod
+    def _top_rows(scores: np.ndarray, top_k: int):
+        """(rows, scores) of the top_k entries of a full score array, best first"""
+        rows = top_k_indices(scores, top_k)
+        return rows, scores[rows]
+    
+    def _rescore_top(self, approx_scores: np.ndarray, query_vector: np.ndarray, top_k: int):
+        """Rescore the best approximate candidates exactly; returns (rows, scores) best first"""
+        candidates = top_k_indices(approx_scores, max(top_k, self.rescore_candidates))
+        exact_scores = self._exact_scores(candidates, query_vector)
+        best = top_k_indices(exact_scores, top_k)
+        return candidates[best], exact_scores[best]
+    
+    def _exact_scores(self, rows: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+        """Full-precision cosine scores for selected rows"""
+        if not self.quantization:
+            return self.normalized_embeddings[rows] @ query_vector
+        # Read the memmap in file order, then restore the caller's order
+        order = np.argsort(rows)
+        scores = np.empty(len(rows), dtype=np.float32)
+        scores[order] = normalize_rows(self.embeddings[rows[order]]) @ query_vector
+        return scores
+    
+    def _partition_scores(self, rows: np.ndarray, query_vectors: np.ndarray) -> np.ndarray:
+        """Exact cosine scores of selected rows against one (dim,) or several (q x dim) queries"""
+        if self._normalized is not None:
+            return self._normalized[rows] @ query_vectors.T
+        # Read only the partition from the memmap instead of normalizing the whole store
+        return normalize_rows(self.embeddings[rows]) @ query_vectors.T
+    
+    @staticmethod
+    def _top_partition_rows(rows: np.ndarray, scores: np.ndarray, top_k: int):
+        """(store rows, scores) of the top_k entries of scores aligned with rows"""
+        best = top_k_indices(scores, top_k)
+        return rows[best], scores[best]
+    
+    def _metadata_index(self, field: str) -> Dict[Any, np.ndarray]:
+        """{value: ascending row ids} for one metadata field, built on first use"""
+        index = self._field_indexes.get(field)
+        if index is None:
+            groups = {}
+            for row, meta in enumerate(self.metadata):
+                value = meta.get(field)
+                if isinstance(value, Hashable):
+                    groups.setdefault(value, []).append(row)
+            index = {value: np.array(rows, dtype=np.int64) for value, rows in groups.items()}
+            self._field_indexes[field] = index
+        return index
+    
+    def _index_metadata(self, records: List[Dict[str, Any]], first_row: int):
+        """Add newly appended rows to the metadata indexes built so far"""
+        for field, index in self._field_indexes.items():
+            groups = {}
+            for row, meta in enumerate(records, start=first_row):
+                value = meta.get(field)
+                if isinstance(value, Hashable):
+                    groups.setdefault(value, []).append(row)
+            for value, rows in groups.items():
+                new_rows = np.array(rows, dtype=np.int64)
+                index[value] = np.concatenate([index[value], new_rows]) if value in index else new_rows
+    
+    @property
+    def chunk_store(self) -> PackedChunkStore:
+        if self._chunk_store is None:
+            self._chunk_store = PackedChunkStore()
+        return self._chunk_store
+    
+    def get_chunk_text(self, row: int) -> str:
+        """Text of a stored chunk, resolving ChunkRefs through the chunk store"""
+        chunk = self.chunks[row]
+        if isinstance(chunk, ChunkRef):
+            return self.chunk_store.read(chunk)
+        return chunk
+    
+    @staticmethod
+    def _record(chunk, metadata: Dict[str, Any]) -> str:
+        """One chunks.jsonl line"""
+        if isinstance(chunk, ChunkRef):
+            return json.dumps({"ref": list(chunk), "metadata": metadata}) + "\n"
+        return json.dumps({"text": chunk, "metadata": metadata}) + "\n"
+    
+    def _invalidate_caches(self):
+        """Drop the memmap and in-memory search copies after the files change"""
+        self._embeddings = None
+        self._normalized = None
+        self._quantized = None
+    
+    def _load_ann_index(self):
+        """Open the persisted ANN index and bring it in line with the stored rows"""
+        if not os.path.exists(self.ann_file):
+            return
+        index = IVFPQIndex.load(self.ann_file)
+        if index.dim != self.dim:
+            return
+        for key in ("nprobe", "rerank"):
+            if key in self.ann_params:
+                setattr(index, key, self.ann_params[key])
+        
+        rows = len(self.chunks)
+        if index.ntotal != rows:
+            # Brought in line in memory; written with the next save
+            self._ann_unsaved = abs(rows - index.ntotal)
+            if index.ntotal > rows:
+                index.truncate(rows)
+            else:
+                index.add(normalize_rows(self.embeddings[index.ntotal:]))
+        self.ann_index = index
+    
+    def _save_ann_index(self):
+        """Write the ANN index, unless another instance changed the store since it was loaded"""
+        with self.write_lock():
+            if self._unchanged_on_disk():
+                self.ann_index.save(self.ann_file)
+        self._ann_unsaved = 0
+    
+    def _results(self, rows: np.ndarray, scores: np.ndarray) -> List[Dict[str, Any]]:
+        """Build result dicts for the selected rows and their scores"""
+        return [
+            {
+                "chunk": self.get_chunk_text(i),
+                "metadata": self.metadata[i],
+                "score": float(score)
+            }
+            for i, score in zip(rows, scores)
+        ]
+    
+    def _write_files(self, matrix: np.ndarray = None):
+        """Rewrite embeddings.f32, chunks.jsonl and the manifest from matrix and the in-memory rows"""
+        with open(self.embeddings_file, 'wb') as f:
+            if matrix is not None:
+                f.write(matrix.tobytes())
+        with open(self.chunks_file, 'w', encoding='utf-8') as f:
+            for text, meta in zip(self.chunks, self.metadata):
+                f.write(self._record(text, meta))
+        self._write_manifest()
     
     def clear(self):
         """Clear all stored data"""
-        self.index = {
-            "chunks": [],
-            "embeddings": [],
-            "metadata": []
-        }
+        self.chunks = []
+        self.metadata = []
         self.save_index()
     
     def get_stats(self) -> Dict[str, Any]:
         """Get statistics about stored data"""
+        files = [self.manifest_file, self.embeddings_file, self.chunks_file, self.ann_file]
+        size = sum(os.path.getsize(p) for p in files if os.path.exists(p))
         return {
-            "total_chunks": len(self.index["chunks"]),
-            "storage_size_mb": os.path.getsize(self.index_file) / (1024 * 1024) if os.path.exists(self.index_file) else 0
+            "total_chunks": len(self.chunks),
+            "documents": len(self.list_documents()),
+            "dimensions": self.dim,
+            "storage_size_mb": size / (1024 * 1024),
+            "quantization": self.quantization or "float32",
+            "ann_index": {
+                "nlist": self.ann_index.nlist,
+                "m": self.ann_index.m,
+                "nprobe": self.ann_index.nprobe,
+                "rerank": self.ann_index.rerank
+            } if self.ann_index is not None else None
+        }
+    
+    def _stored_rows(self) -> int:
+        """Number of complete embedding rows in the binary file"""
+        if not self.dim or not os.path.exists(self.embeddings_file):
+            return 0
+        row_bytes = self.dim * np.dtype(self.DTYPE).itemsize
+        return os.path.getsize(self.embeddings_file) // row_bytes
+    
+    def _unchanged_on_disk(self) -> bool:
+        """Whether the embeddings file still holds exactly the rows loaded into memory"""
+        expected = len(self.chunks) * (self.dim or 0) * np.dtype(self.DTYPE).itemsize
+        actual = os.path.getsize(self.embeddings_file) if os.path.exists(self.embeddings_file) else 0
+        return actual == expected
+    
+    def _check_unchanged_on_disk(self):
+        """Refuse to write when another store instance changed the files since load_index"""
+        if not self._unchanged_on_disk():
+            raise RuntimeError(
+                f"Vector store in {self.storage_dir} changed on disk since it was loaded; "
+                f"call load_index() and re-plan"
+            )
+    
+    def _write_manifest(self):
+        """Write the manifest describing the binary matrix"""
+        manifest = {
+            "format_version": self.FORMAT_VERSION,
+            "dtype": np.dtype(self.DTYPE).name,
+            "dim": self.dim,
+            "rows": len(self.chunks)
         }
+        tmp_path = self.manifest_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_file)
+    
+    def _migrate_legacy_index(self):
+        """Convert a JSON index.json store into the binary format (index.json is left in place)"""
+        with open(self.index_file, 'r') as f:
+            legacy = json.load(f)
+        
+        print(f"Migrating {len(legacy.get('chunks', []))} chunks from {self.index_file} to binary format...")
+        self.chunks = []
+        self.metadata = []
+        self.dim = None
+        self.ann_index = None
+        self._ann_unsaved = 0
+        self._field_indexes = {}
+        self._invalidate_caches()
+        for path in (self.embeddings_file, self.chunks_file, self.ann_file):
+            if os.path.exists(path):
+                os.remove(path)
+        
+        if legacy.get("chunks"):
+            self.add_chunks(legacy["chunks"], legacy["embeddings"], legacy.get("metadata"))
+        else:
+            self._write_manifest()
+
+
+def benchmark_ann(store: LocalVectorStore, k: int = 10, num_queries: int = 200,
+                  nprobe_values=(1, 4, 8, 16, 32), noise: float = 0.05, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Measure recall@k and latency of the ANN index against exact search
+    
+    Queries are stored vectors with Gaussian noise added, so they resemble
+    real queries without matching a row exactly.
+    
+    Args:
+        store: Store to benchmark (the ANN index is built if missing)
+        k: Number of neighbours compared
+        num_queries: Number of sampled queries
+        nprobe_values: nprobe settings to sweep
+        noise: Standard deviation of the noise relative to a unit vector
+        seed: Random seed for query sampling
+    
+    Returns:
+        List of {"nprobe", "recall_at_k", "ann_ms", "exact_ms"} rows
+    """
+    import time
+    
+    if store.ann_index is None:
+        store.build_ann_index()
+    index = store.ann_index
+    
+    rng = np.random.default_rng(seed)
+    base = store.normalized_embeddings
+    rows = rng.choice(len(base), min(num_queries, len(base)), replace=False)
+    queries = normalize_rows(base[rows] + rng.normal(0, noise / np.sqrt(store.dim), (len(rows), store.dim)))
+    
+    start = time.perf_counter()
+    truth = [set(top_k_indices(base @ q, k).tolist()) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    
+    original_nprobe = index.nprobe
+    report = []
+    try:
+        for nprobe in nprobe_values:
+            index.nprobe = nprobe
+            start = time.perf_counter()
+            found = [store._ann_rows(q, k)[0] for q in queries]
+            ann_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            
+            hits = sum(len(truth_ids & set(rows.tolist())) for truth_ids, rows in zip(truth, found))
+            report.append({
+                "nprobe": nprobe,
+                "recall_at_k": hits / (len(queries) * k),
+                "ann_ms": ann_ms,
+                "exact_ms": exact_ms
+            })
+    finally:
+        index.nprobe = original_nprobe
+    
+    return report
+
+
+def quantization_report(store: LocalVectorStore, k: int = 10, num_queries: int = 200,
+                        rescore_candidates: int = 100, noise: float = 0.05, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Compare search memory and recall@k for float32, float16 and int8 storage
+    
+    Queries are stored vectors with Gaussian noise added. Recall is measured
+    against exact float32 search, both for the compact first pass alone and
+    after exact rescoring of rescore_candidates rows.
+    
+    Args:
+        store: Store to measure
+        k: Number of neighbours compared
+        num_queries: Number of sampled queries
+        rescore_candidates: Candidates rescored at full precision
+        noise: Standard deviation of the noise relative to a unit vector
+        seed: Random seed for query sampling
+    
+    Returns:
+        List of {"mode", "memory_mb", "recall_first_pass", "recall_rescored", "query_ms"} rows
+    """
+    import time
+    
+    rng = np.random.default_rng(seed)
+    base = normalize_rows(store.embeddings)
+    rows = rng.choice(len(base), min(num_queries, len(base)), replace=False)
+    queries = normalize_rows(base[rows] + rng.normal(0, noise / np.sqrt(store.dim), (len(rows), store.dim)))
+    truth = [set(top_k_indices(base @ q, k).tolist()) for q in queries]
+    
+    def recall(found):
+        return sum(len(t & set(f.tolist())) for t, f in zip(truth, found)) / (len(queries) * k)
+    
+    report = []
+    start = time.perf_counter()
+    found = [top_k_indices(base @ q, k) for q in queries]
+    report.append({
+        "mode": "float32",
+        "memory_mb": base.nbytes / (1024 * 1024),
+        "recall_first_pass": recall(found),
+        "recall_rescored": recall(found),
+        "query_ms": (time.perf_counter() - start) * 1000 / len(queries)
+    })
+    
+    for mode in QuantizedMatrix.MODES:
+        compact = QuantizedMatrix.from_vectors(mode, store.embeddings)
+        first_pass, rescored = [], []
+        start = time.perf_counter()
+        for q in queries:
+            scores = compact.scores(q)
+            candidates = top_k_indices(scores, max(k, rescore_candidates))
+            exact = base[candidates] @ q
+            rescored.append(candidates[top_k_indices(exact, k)])
+            first_pass.append(candidates[:k])
+        report.append({
+            "mode": mode,
+            "memory_mb": compact.nbytes / (1024 * 1024),
+            "recall_first_pass": recall(first_pass),
+            "recall_rescored": recall(rescored),
+            "query_ms": (time.perf_counter() - start) * 1000 / len(queries)
+        })
+    
+    return report
 
 
 # Example usage
 if __name__ == "__main__":
+    import sys
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        # python local_vector_store.py benchmark [storage_dir]
+        store = LocalVectorStore(sys.argv[2] if len(sys.argv) > 2 else "data/embeddings")
+        print(f"Recall@10 benchmark over {len(store.chunks)} chunks")
+        print(f"{'nprobe':>8} {'recall@10':>10} {'ann ms':>8} {'exact ms':>9}")
+        for row in benchmark_ann(store):
+            print(f"{row['nprobe']:>8} {row['recall_at_k']:>10.3f} {row['ann_ms']:>8.2f} {row['exact_ms']:>9.2f}")
+        sys.exit(0)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == "quantization-report":
+        # python local_vector_store.py quantization-report [storage_dir]
+        store = LocalVectorStore(sys.argv[2] if len(sys.argv) > 2 else "data/embeddings")
+        print(f"Quantization report over {len(store.chunks)} chunks (recall@10)")
+        print(f"{'mode':>8} {'memory MB':>10} {'first pass':>11} {'rescored':>9} {'query ms':>9}")
+        for row in quantization_report(store):
+            print(f"{row['mode']:>8} {row['memory_mb']:>10.1f} {row['recall_first_pass']:>11.3f} "
+                  f"{row['recall_rescored']:>9.3f} {row['query_ms']:>9.2f}")
+        sys.exit(0)
+    
     store = LocalVectorStore()
     
     # Add some chunks
@@ -1,5 +1,7 @@
 """Orchestrator - Coordinates all RFP analysis agents"""
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from memory.short_term_memory import ShortTermMemory
 from agents.introduction_agent import IntroductionAgent
 from agents.business_process_agent import BusinessProcessAgent
@@ -20,16 +22,25 @@ from llm_client import LLMClient
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PROMPTS_DIR = os.path.join(BASE_DIR, "prompts")
 
+# Agents whose LLM calls run at the same time (12 = all at once; lower it if the deployment hits rate limits)
+AGENT_CONCURRENCY = int(os.getenv("AGENT_CONCURRENCY", "12"))
+
 # Initialize LLM client
 llm_client = LLMClient()
 LLM = llm_client.generate  # Use the generate method as callable
 
-def run_all_agents(text: str) -> dict:
+def run_all_agents(text: str, max_workers: int = None, timings: dict = None) -> dict:
     """
     Run all 12 RFP analysis agents on the given text.
     
+    The agents are independent, so their LLM calls run on a thread pool of up
+    to max_workers at a time. Results are added to memory in the fixed agent
+    order below, whatever order the calls finish in.
+    
     Args:
         text: RFP document text to analyze
+        max_workers: Concurrent agent calls (default: AGENT_CONCURRENCY; 1 = sequential)
+        timings: Optional dict filled with {agent_name: seconds}
         
     Returns:
         dict: All agent outputs {agent_name: analysis_result}
@@ -52,11 +63,28 @@ def run_all_agents(text: str) -> dict:
         "impact": ImpactfulStatementsAgent(LLM, open(os.path.join(PROMPTS_DIR, "impact.txt")).read()),
     }
 
-    # Run each agent
-    for name, agent in agents.items():
+    def run_agent(name, agent):
         print(f"  • Running {name} agent...")
+        start = time.perf_counter()
         output = agent.extract(text)
-        memory.add(name, output)
+        return output, time.perf_counter() - start
+
+    # Run the agents concurrently, then store their outputs in a deterministic order
+    start = time.perf_counter()
+    workers = max(1, min(max_workers or AGENT_CONCURRENCY, len(agents)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(run_agent, name, agent) for name, agent in agents.items()}
+        durations = {}
+        for name, future in futures.items():
+            output, durations[name] = future.result()
+            memory.add(name, output)
+    wall = time.perf_counter() - start
+
+    if timings is not None:
+        timings.update(durations)
+    slowest = max(durations, key=durations.get)
+    print(f"✓ {len(agents)} agents in {wall:.1f}s with {workers} concurrent "
+          f"(sum of calls {sum(durations.values()):.1f}s, slowest {slowest} {durations[slowest]:.1f}s)")
 
     return memory.get_all()
 
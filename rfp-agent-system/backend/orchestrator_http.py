@@ -5,8 +5,9 @@ Supports both local agents and Azure Container Apps deployment
 import os
 import httpx
 import asyncio
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from memory.short_term_memory import ShortTermMemory
+from agent_definitions import AGENT_DEPENDENCIES, AGENT_ORDER, topological_order
 
 # Configuration - Set these URLs after deploying to Azure Container Apps
 # Agent names use underscores internally but Container App names use hyphens
@@ -61,48 +62,83 @@ async def call_agent(agent_name: str, text: str, context: Dict = None, client: h
         print(f"  ✗ Error calling {agent_name}: {str(e)}")
         return f"Error: {str(e)}"
 
-async def run_all_agents_async(text: str) -> dict:
+def critical_path(spans: Dict[str, tuple], dependencies: Dict[str, List[str]]) -> List[str]:
+    """
+    Chain of agents that determined the run's wall-clock time
+    
+    Starts at the agent that finished last and walks back through the
+    dependency that finished last (the one its start waited for).
+    
+    Args:
+        spans: {agent_name: (start_seconds, end_seconds)} relative to the run start
+        dependencies: {agent_name: [upstream agent names]}
+        
+    Returns:
+        List[str]: Agent names, first to last
+    """
+    if not spans:
+        return []
+    path = [max(spans, key=lambda name: spans[name][1])]
+    while dependencies.get(path[-1]):
+        path.append(max(dependencies[path[-1]], key=lambda name: spans[name][1]))
+    return list(reversed(path))
+
+async def run_all_agents_async(text: str, dependencies: Dict[str, List[str]] = None, report: Dict = None) -> dict:
     """
     Run all 12 RFP analysis agents asynchronously via HTTP.
     
+    Agents are scheduled along their dependency graph: each call is fired as
+    soon as the agents it depends on have finished, so independent agents run
+    concurrently, and each agent receives only its upstream results as context.
+    
     Args:
         text: RFP document text to analyze
+        dependencies: {agent_name: [upstream agent names]} (default: AGENT_DEPENDENCIES)
+        report: Optional dict filled with wall time, per-agent spans and the critical path
         
     Returns:
         dict: All agent outputs {agent_name: analysis_result}
     """
+    dependencies = dependencies or AGENT_DEPENDENCIES
+    order = topological_order(dependencies)
     memory = ShortTermMemory()
     results = {}
+    spans = {}
     
     async with httpx.AsyncClient(timeout=TIMEOUT) as client:
-        # Run agents in order (some depend on previous results)
-        agent_order = [
-            "introduction",
-            "challenges",
-            "pain_points",
-            "business_process",
-            "gap",
-            "personas",
-            "constraints",
-            "functional_requirements",
-            "nfr",
-            "architecture",
-            "assumptions",
-            "impact",
-        ]
-        
-        for agent_name in agent_order:
-            # Get context from previous agents
-            context = memory.get_all()
+        loop = asyncio.get_running_loop()
+        run_start = loop.time()
+        tasks = {}
+        
+        async def run_agent(agent_name):
+            # Wait for upstream agents, then pass on only their results
+            await asyncio.gather(*(tasks[dep] for dep in dependencies[agent_name]))
+            context = {dep: results[dep] for dep in dependencies[agent_name]}
             
-            # Call agent
+            start = loop.time() - run_start
             result = await call_agent(agent_name, text, context, client)
-            
-            # Store result
-            memory.add(agent_name, result)
+            spans[agent_name] = (start, loop.time() - run_start)
             results[agent_name] = result
+            return result
+        
+        # Every task exists before any of them runs, so dependents can await their upstream tasks
+        for agent_name in order:
+            tasks[agent_name] = asyncio.ensure_future(run_agent(agent_name))
+        await asyncio.gather(*tasks.values())
+        wall = loop.time() - run_start
+    
+    # Store results in a fixed order, whatever order the calls finished in
+    for agent_name in AGENT_ORDER + [name for name in order if name not in AGENT_ORDER]:
+        if agent_name in results:
+            memory.add(agent_name, results[agent_name])
+    
+    path = critical_path(spans, dependencies)
+    print(f"✓ {len(results)} agents in {wall:.1f}s (sum of calls {sum(end - start for start, end in spans.values()):.1f}s)")
+    print("  Critical path: " + " → ".join(f"{name} ({spans[name][1] - spans[name][0]:.1f}s)" for name in path))
+    if report is not None:
+        report.update(wall_seconds=wall, spans=spans, critical_path=path)
     
-    return results
+    return memory.get_all()
 
 async def run_all_agents(text: str) -> dict:
     """
@@ -206,7 +242,7 @@ if __name__ == "__main__":
         text = "This is a test RFP for inventory management system using IoT sensors."
     
     print("Running agents via HTTP...")
-    results = run_all_agents(text)
+    results = asyncio.run(run_all_agents(text))
     
     print("\n=== All Agent Results ===")
     for agent_name, output in results.items():
@@ -1,127 +1,374 @@
 # Complete RFP Processing Pipeline
 # Uses: Azure Blob Storage, Azure Document Intelligence, Azure OpenAI (GPT-4o)
 
+import asyncio
 import os
 import sys
 from dotenv import load_dotenv
-from document_processing.extract_text import extract_text_from_blob, extract_text_from_pdf
-from document_processing.chunking import chunk_text
-from embedding.embedder import generate_embedding
-from azure_openai_orchestrator import AzureOpenAIOrchestrator
+from document_processing.extract_text import (
+    analyze_pdf_layout_async, download_blob_bytes_async, extract_text_from_pdf_bytes_async,
+    extract_text_from_pdf_bytes_local
+)
+from document_processing.chunking import blocks_to_text, chunk_by_sections, chunk_text, chunk_text_by_tokens
+from document_processing.chunk_store import ChunkRef, PackedChunkStore
+from document_processing.dedup import deduplicate_chunks
+from document_processing.tables import compact_tables, table_token_report
+from document_processing.ingest_manifest import (
+    IngestManifest, combine_fingerprints, fingerprint_bytes, fingerprint_chunks, fingerprint_text
+)
+from document_processing.tokenization import (
+    get_embedding_token_counter, get_llm_token_counter, pack_to_token_budget
+)
+from embedding.embedder import embed_batch
+from embedding.cache import get_embedding_cache
+from azure_openai_orchestrator import AsyncAzureOpenAIOrchestrator
+from storage_clients import run_sync
+import config
 
 # Load environment variables
 load_dotenv()
 
-async def process_rfp_document(blob_name: str = None, file_path: str = None):
+# Number of chunks encoded per model forward pass during ingestion
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+
+# "tokens": chunks sized by the embedding model's tokenizer (never truncated at encode time)
+# "words": legacy 500-word chunks
+CHUNKING_MODE = os.getenv("CHUNKING_MODE", "tokens").lower()
+
+# "text": flat prebuilt-read text
+# "layout": prebuilt-layout headings, paragraphs and tables, chunked along section boundaries (PDF only)
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "text").lower()
+
+# Table serialization in layout mode: "csv" (compact, header once) or "markdown"
+TABLE_FORMAT = os.getenv("TABLE_FORMAT", "csv").lower()
+
+# Token budget for the RFP text sent to each agent
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "2000"))
+
+# Collapse chunks whose estimated word 5-gram Jaccard similarity is at least this (1.0 = exact only).
+# Below 1.0, chunks that differ only in a few numbers (quantities, dates) lose their variant text
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "1.0"))
+
+# Skip extraction, chunking, embedding and agent calls whose input fingerprint was already processed
+INCREMENTAL_INGESTION = os.getenv("INCREMENTAL_INGESTION", "true").lower() == "true"
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _count_tokens(counter, texts):
+    return [counter.count(text) for text in texts]
+
+
+async def process_rfp_document(blob_name: str = None, file_path: str = None, document_name: str = None,
+                               return_stages: bool = False):
     """
     Complete pipeline to process RFP document
     
+    With INCREMENTAL_INGESTION enabled, every stage is skipped when its input
+    fingerprint matches work recorded in the ingest manifest, and only changed
+    chunks are embedded and indexed.
+    
     Args:
         blob_name: Name of blob in Azure Storage (if using Blob Storage)
         file_path: Local file path (if not using Blob Storage)
+        document_name: Name the document is indexed under (default: blob name or file name);
+            re-ingesting a changed document under the same name only re-indexes changed chunks
+        return_stages: Also return the ingestion report (which stages were reused)
         
     Returns:
-        dict: Analysis results from all agents
+        dict: Analysis results from all agents, or (results, ingestion report) if return_stages
     """
     print("=" * 60)
     print("RFP PROCESSING PIPELINE")
     print("=" * 60)
     
+    # Blocking work (file I/O, tokenizer loads, chunking, the vector store) runs in
+    # asyncio.to_thread so one document does not stall other requests on the event loop
+    manifest = await asyncio.to_thread(IngestManifest) if INCREMENTAL_INGESTION else None
+    ingestion = {}
+    
     # Step 1: Extract text from document
     print("\n[1/5] Extracting text from document...")
+    is_pdf = True
     if blob_name:
         try:
-            text = extract_text_from_blob(blob_name)
-            print(f"✓ Extracted text from blob: {blob_name}")
+            file_bytes = await download_blob_bytes_async(blob_name)
+            print(f"✓ Downloaded blob: {blob_name}")
         except Exception as e:
-            print(f"✗ Error extracting from blob: {e}")
+            print(f"✗ Error downloading blob: {e}")
             print("Falling back to local file if provided...")
             if file_path:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    text = f.read()
+                file_bytes = await asyncio.to_thread(_read_file, file_path)
+                is_pdf = False
             else:
                 raise
     elif file_path:
-        # For PDF files, read bytes and process directly (no blob upload needed)
-        if file_path.lower().endswith('.pdf'):
-            try:
-                print(f"Reading PDF file...")
-                with open(file_path, 'rb') as f:
-                    file_bytes = f.read()
-                
-                print(f"Extracting text from PDF using Azure Document Intelligence...")
-                from document_processing.extract_text import extract_text_from_pdf_bytes
-                text = extract_text_from_pdf_bytes(file_bytes)
-                print(f"✓ Extracted text from PDF: {file_path}")
-            except Exception as e:
-                print(f"✗ PDF extraction failed: {e}")
-                raise
-        else:
-            # Plain text file
-            with open(file_path, 'r', encoding='utf-8') as f:
-                text = f.read()
-            print(f"✓ Loaded text from: {file_path}")
+        file_bytes = await asyncio.to_thread(_read_file, file_path)
+        is_pdf = file_path.lower().endswith('.pdf')
     else:
         raise ValueError("Either blob_name or file_path must be provided")
     
+    fingerprint = fingerprint_bytes(file_bytes)
+    ingestion["fingerprint"] = fingerprint
+    extraction_mode = EXTRACTION_MODE if is_pdf else "text"
+    extraction_config = f"layout:{TABLE_FORMAT}" if extraction_mode == "layout" else "text"
+    record = manifest.get(fingerprint) if manifest else None
+    blocks = None
+    text = None
+    if record and record.get("extraction_config", "text") == extraction_config:
+        text = await asyncio.to_thread(manifest.load_text, fingerprint)
+    
+    if text is not None:
+        ingestion["extraction"] = "reused"
+        print(f"✓ Reused extracted text (fingerprint {fingerprint[:12]})")
+    elif is_pdf:
+        try:
+            if extraction_mode == "layout":
+                print(f"Extracting layout (headings, paragraphs, tables) using Azure Document Intelligence...")
+                blocks = await analyze_pdf_layout_async(file_bytes)
+                text = blocks_to_text(compact_tables(blocks), TABLE_FORMAT)
+            elif config.PDF_EXTRACTION_BACKEND == "local":
+                print(f"Extracting text from PDF text layer (scanned pages via Azure Document Intelligence)...")
+                text = await asyncio.to_thread(extract_text_from_pdf_bytes_local, file_bytes)
+            else:
+                print(f"Extracting text from PDF using Azure Document Intelligence...")
+                text = await extract_text_from_pdf_bytes_async(file_bytes)
+            print(f"✓ Extracted text from PDF: {blob_name or file_path}")
+        except Exception as e:
+            print(f"✗ PDF extraction failed: {e}")
+            raise
+    else:
+        # Plain text file
+        text = file_bytes.decode('utf-8')
+        print(f"✓ Loaded text from: {file_path}")
+    
+    if "extraction" not in ingestion:
+        ingestion["extraction"] = "computed"
+        if manifest:
+            await asyncio.to_thread(manifest.save_text, fingerprint, text)
+    
     print(f"Document length: {len(text)} characters")
     
+    if document_name:
+        filename = document_name
+    elif record and record.get("filename"):
+        # Identical bytes were already indexed (e.g. the same PDF under a new timestamped blob name)
+        filename = record["filename"]
+    else:
+        filename = blob_name or (os.path.basename(file_path) if file_path else "unknown")
+    
     # Step 2: Chunk the text
     print("\n[2/5] Chunking text...")
-    chunks = chunk_text(text, max_tokens=500)
-    print(f"✓ Created {len(chunks)} chunks")
+    if extraction_mode == "layout":
+        token_counter = await asyncio.to_thread(get_embedding_token_counter)
+        chunk_config = f"sections:{token_counter.name}:{token_counter.max_tokens}:{TABLE_FORMAT}"
+    elif CHUNKING_MODE == "tokens":
+        token_counter = await asyncio.to_thread(get_embedding_token_counter)
+        chunk_config = f"tokens:{token_counter.name}:{token_counter.max_tokens}"
+    else:
+        chunk_config = "words:500"
+    text_fingerprint = await asyncio.to_thread(fingerprint_text, text)
+    
+    chunk_store = PackedChunkStore()
+    llm_counter = await asyncio.to_thread(get_llm_token_counter)
+    previous = manifest.find_chunks(text_fingerprint, chunk_config) if manifest else None
+    chunk_refs = [ChunkRef(*ref) for ref in previous["chunk_refs"]] if previous else []
+    
+    def read_chunks(refs, hashes):
+        """Stored chunk texts, or None if any of them is gone or no longer matches its recorded hash"""
+        # A deleted pack can be regrown under the same doc_id, so refs may point at other text
+        if hashes is None or len(hashes) != len(refs) or not all(chunk_store.contains(ref) for ref in refs):
+            return None
+        try:
+            texts = [chunk_store.read(ref) for ref in refs]
+        except UnicodeDecodeError:
+            return None
+        return texts if fingerprint_chunks(texts) == hashes else None
+    
+    chunks = await asyncio.to_thread(read_chunks, chunk_refs, previous.get("chunk_hashes")) if previous else None
+    if chunks is not None:
+        ingestion["chunking"] = "reused"
+        if previous.get("table_report"):
+            ingestion["tables"] = previous["table_report"]
+        print(f"✓ Reused {len(chunks)} chunks (unchanged text)")
+    else:
+        if extraction_mode == "layout":
+            if blocks is None:
+                # Text was reused but not its chunks; the blocks come from the extraction cache
+                blocks = await analyze_pdf_layout_async(file_bytes)
+            chunks = await asyncio.to_thread(
+                chunk_by_sections, compact_tables(blocks), token_counter, table_format=TABLE_FORMAT
+            )
+            chunk_tokens = await asyncio.to_thread(_count_tokens, token_counter, chunks)
+            sections = sum(1 for block in blocks if block["type"] == "heading")
+            print(f"✓ Created {len(chunks)} section chunks from {sections} headings "
+                  f"(max {max(chunk_tokens, default=0)}/{token_counter.max_tokens} {token_counter.name} tokens)")
+            
+            # Prompt tokens of the tables as one line per cell vs the compact serialization
+            table_report = await asyncio.to_thread(table_token_report, blocks, llm_counter, TABLE_FORMAT)
+            if table_report["tables"]:
+                ingestion["tables"] = table_report
+                print(f"✓ Tables: {table_report['tables']} tables ({table_report['cells']} cells) as {TABLE_FORMAT}: "
+                      f"{table_report['cell_line_tokens']} -> {table_report['compact_tokens']} tokens "
+                      f"({table_report['savings_pct']:.0f}% saved; markdown {table_report['markdown_tokens']})")
+        elif CHUNKING_MODE == "tokens":
+            chunks = await asyncio.to_thread(chunk_text_by_tokens, text, token_counter)
+            chunk_tokens = await asyncio.to_thread(_count_tokens, token_counter, chunks)
+            print(f"✓ Created {len(chunks)} chunks "
+                  f"(max {max(chunk_tokens, default=0)}/{token_counter.max_tokens} {token_counter.name} tokens)")
+        else:
+            chunks = await asyncio.to_thread(chunk_text, text, max_tokens=500)
+            print(f"✓ Created {len(chunks)} chunks")
+        
+        # Append chunks to the document's packed chunk file (one write, read back via mmap)
+        doc_id = chunk_store.make_doc_id(filename)
+        chunk_refs = await asyncio.to_thread(chunk_store.append_chunks, doc_id, chunks)
+        ingestion["chunking"] = "computed"
+        print(f"✓ Saved chunks to {chunk_store.pack_path(doc_id)}")
     
-    # Save chunks to data/chunks directory
-    chunks_dir = "data/chunks"
-    os.makedirs(chunks_dir, exist_ok=True)
-    for i, chunk in enumerate(chunks):
-        with open(f"{chunks_dir}/chunk_{i+1}.txt", 'w', encoding='utf-8') as f:
-            f.write(chunk)
-    print(f"✓ Saved chunks to {chunks_dir}/")
+    # Collapse repeated boilerplate so it is embedded and sent to the agents only once
+    dedup = await asyncio.to_thread(
+        deduplicate_chunks, chunks, threshold=DEDUP_THRESHOLD, token_counter=llm_counter,
+        token_budget=LLM_CONTEXT_TOKENS
+    )
+    unique_chunks, chunk_sources = dedup["chunks"], dedup["sources"]
+    dedup_report = dedup["report"]
+    print(f"✓ Deduplicated: {dedup_report['unique_chunks']}/{dedup_report['input_chunks']} chunks kept "
+          f"({dedup_report['exact_duplicates']} exact, {dedup_report['near_duplicates']} near duplicates; "
+          f"saved {dedup_report['embeddings_saved']} embeddings, ~{dedup_report['tokens_saved']}/{LLM_CONTEXT_TOKENS} prompt tokens)")
     
     # Step 3: Generate embeddings and store locally
     print("\n[3/5] Generating embeddings and storing locally...")
     from local_vector_store import LocalVectorStore
     
-    vector_store = LocalVectorStore()
-    embeddings = []
+    vector_store = await asyncio.to_thread(LocalVectorStore, chunk_store=chunk_store)
     
-    filename = blob_name or os.path.basename(file_path) if file_path else "unknown"
+    # chunk_id is the first occurrence; source_chunk_ids lists every location the text appears
+    # The store keeps a reference into the pack file instead of a second copy of the text
+    chunk_hashes = fingerprint_chunks(unique_chunks)
+    metadatas = [
+        {"filename": filename, "chunk_id": sources[0] + 1, "source_chunk_ids": [i + 1 for i in sources],
+         "chunk_hash": chunk_hash}
+        for sources, chunk_hash in zip(chunk_sources, chunk_hashes)
+    ]
     
-    for i, chunk in enumerate(chunks):
-        emb = generate_embedding(chunk)
-        embeddings.append(emb)
-        
-        # Store in local vector store (no database needed!)
-        vector_store.add_chunk(
-            text=chunk,
-            embedding=emb,
-            metadata={"filename": filename, "chunk_id": i + 1}
-        )
-        
-        if (i + 1) % 10 == 0:
-            print(f"  Processed {i + 1}/{len(chunks)} chunks")
+    # Rows already indexed for this document are kept if their chunk (and its positions) is unchanged
+    def row_key(meta):
+        return meta.get("chunk_hash"), tuple(meta.get("source_chunk_ids", ()))
+    
+    def plan_index():
+        """(stale row ids, positions of chunks still to add) against the store's current rows"""
+        existing_rows = vector_store.filter_rows({"filename": filename}) if INCREMENTAL_INGESTION else []
+        wanted = {row_key(meta) for meta in metadatas}
+        indexed = {row_key(vector_store.metadata[row]) for row in existing_rows}
+        stale = [row for row in existing_rows if row_key(vector_store.metadata[row]) not in wanted]
+        return stale, [i for i, meta in enumerate(metadatas) if row_key(meta) not in indexed]
+    
+    async def embed_positions(positions):
+        """Encode in batches on a worker thread so the event loop keeps serving other requests"""
+        vectors = {}
+        for start in range(0, len(positions), EMBEDDING_BATCH_SIZE):
+            batch = positions[start:start + EMBEDDING_BATCH_SIZE]
+            encoded = await asyncio.to_thread(
+                embed_batch, [unique_chunks[i] for i in batch], batch_size=EMBEDDING_BATCH_SIZE
+            )
+            vectors.update(zip(batch, encoded))
+            print(f"  Embedded {start + len(batch)}/{len(positions)} chunks")
+        return vectors
+    
+    def commit_index():
+        """Reload, re-plan and write while holding the store's write lock, so no other request interleaves"""
+        with vector_store.write_lock():
+            # Another request may have written to the store while we were embedding
+            vector_store.load_index()
+            stale_rows, new_positions = plan_index()
+            missing = [i for i in new_positions if i not in embeddings]
+            if missing:
+                embeddings.update(zip(missing, embed_batch(
+                    [unique_chunks[i] for i in missing], batch_size=EMBEDDING_BATCH_SIZE
+                )))
+            
+            # Commit everything to the store in one write
+            vector_store.add_chunks(
+                texts=[chunk_refs[chunk_sources[i][0]] for i in new_positions],
+                embeddings=[embeddings[i] for i in new_positions],
+                metadatas=[metadatas[i] for i in new_positions]
+            )
+            # Rows are appended, so stale row ids are still valid here; removing them last keeps the pack alive
+            removed = vector_store.delete_rows(stale_rows)
+        return new_positions, removed
+    
+    _, new_positions = await asyncio.to_thread(plan_index)
+    embeddings = await embed_positions(new_positions)
+    new_positions, removed = await asyncio.to_thread(commit_index)
     
-    stats = vector_store.get_stats()
-    print(f"✓ Generated {len(embeddings)} embeddings (768-dim)")
+    if not new_positions and not removed:
+        ingestion["indexing"] = "reused"
+    elif len(new_positions) < len(unique_chunks):
+        ingestion["indexing"] = "partial"
+    else:
+        ingestion["indexing"] = "computed"
+    ingestion["chunks_embedded"] = len(new_positions)
+    ingestion["chunks_removed"] = removed
+    
+    stats = await asyncio.to_thread(vector_store.get_stats)
+    print(f"✓ Generated {len(embeddings)} embeddings (768-dim); "
+          f"{len(unique_chunks) - len(new_positions)} unchanged, {removed} removed")
+    cache = get_embedding_cache()
+    if cache:
+        cache_stats = await asyncio.to_thread(cache.get_stats)
+        print(f"✓ Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
     print(f"✓ Stored in local vector store: {stats['total_chunks']} chunks")
     
     # Step 4: Run all agents using Azure OpenAI directly
     print("\n[4/5] Running AI agents for analysis...")
-    orchestrator = AzureOpenAIOrchestrator()
-    # Use full text for comprehensive analysis (or first 8000 chars if too long)
-    analysis_text = text[:8000] if len(text) > 8000 else text
-    results = orchestrator.run_all_agents(analysis_text)
-    print(f"✓ Completed analysis with {len(results)} agents")
+    # Pack the deduplicated chunks, in document order, into a fixed token budget
+    analysis_text = await asyncio.to_thread(pack_to_token_budget, unique_chunks, LLM_CONTEXT_TOKENS, llm_counter)
+    print(f"  Agent context: {llm_counter.count(analysis_text)}/{LLM_CONTEXT_TOKENS} tokens ({llm_counter.name})")
+    analysis_key = combine_fingerprints(fingerprint_text(analysis_text), config.AZURE_OPENAI_MODEL)
+    results = await asyncio.to_thread(manifest.load_results, analysis_key) if manifest else None
+    
+    if results is not None:
+        ingestion["analysis"] = "reused"
+        print(f"✓ Reused analysis from {len(results)} agents (unchanged agent input)")
+    else:
+        orchestrator = AsyncAzureOpenAIOrchestrator()
+        results = await orchestrator.run_all_agents_async(analysis_text)
+        ingestion["analysis"] = "computed"
+        print(f"✓ Completed analysis with {len(results)} agents")
+        # Failed agents are retried on the next run instead of being replayed
+        if manifest and all(result.get("status") == "success" for result in results.values()):
+            await asyncio.to_thread(manifest.save_results, analysis_key, results)
+    
+    if manifest:
+        await asyncio.to_thread(
+            manifest.update,
+            fingerprint,
+            filename=filename,
+            extraction_config=extraction_config,
+            text_sha256=text_fingerprint,
+            chunk_config=chunk_config,
+            chunk_refs=[list(ref) for ref in chunk_refs],
+            chunk_hashes=fingerprint_chunks(chunks),
+            table_report=ingestion.get("tables"),
+            analysis_key=analysis_key
+        )
     
     # Step 5: Results ready (don't auto-save to file)
     print("\n[5/5] Analysis complete - results ready")
     print("✓ Results available via API (kb.md not auto-generated)")
+    reused = [stage for stage in ("extraction", "chunking", "indexing", "analysis") if ingestion[stage] == "reused"]
+    print(f"✓ Reused stages: {', '.join(reused) or 'none'}")
     
     print("\n" + "=" * 60)
     print("PROCESSING COMPLETE")
     print("=" * 60)
     
+    if return_stages:
+        return results, ingestion
     return results
 
 
@@ -144,7 +391,7 @@ def main():
         return
     
     try:
-        results = process_rfp_document(blob_name=args.blob, file_path=args.file)
+        results = run_sync(process_rfp_document(blob_name=args.blob, file_path=args.file))
         
         print("\n--- SUMMARY ---")
         for agent_name in results.keys():
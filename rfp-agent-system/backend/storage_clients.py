@@ -0,0 +1,121 @@
+# Process-wide Azure Blob Storage clients (pooled connections, cached container state)
+import asyncio
+import threading
+
+import requests
+from azure.core.exceptions import ResourceExistsError
+from azure.core.pipeline.transport import RequestsTransport
+from azure.storage.blob import BlobServiceClient
+from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
+import config
+
+_client = None
+_async_clients = {}  # event loop -> aio client (aiohttp sessions belong to the loop that created them)
+_ensured_containers = set()
+_lock = threading.Lock()
+
+
+def get_blob_service_client() -> BlobServiceClient:
+    """
+    Shared sync client; its HTTP session keeps up to BLOB_POOL_SIZE connections alive
+    
+    Returns:
+        BlobServiceClient: Client for config.BLOB_CONN_STRING (safe to use from several threads)
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                if not config.BLOB_CONN_STRING:
+                    raise ValueError("Azure Blob Storage connection string not configured")
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=config.BLOB_POOL_SIZE, pool_maxsize=config.BLOB_POOL_SIZE
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _client = BlobServiceClient.from_connection_string(
+                    config.BLOB_CONN_STRING,
+                    transport=RequestsTransport(session=session, session_owner=False),
+                    **config.BLOB_TRANSFER_OPTIONS
+                )
+    return _client
+
+
+def get_async_blob_service_client() -> AsyncBlobServiceClient:
+    """
+    Shared aio client for the running event loop
+    
+    The client is not closed by its users; call close_async_blob_service_client
+    before the loop ends (API shutdown, or use run_sync for one-shot runs).
+    
+    Returns:
+        AsyncBlobServiceClient: Client for config.BLOB_CONN_STRING
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        if not config.BLOB_CONN_STRING:
+            raise ValueError("Azure Blob Storage connection string not configured")
+        client = AsyncBlobServiceClient.from_connection_string(
+            config.BLOB_CONN_STRING, **config.BLOB_TRANSFER_OPTIONS
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def close_async_blob_service_client() -> None:
+    """Close the running loop's aio client (and its connection pool), if one was created"""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def run_sync(coro):
+    """asyncio.run for one-shot callers (CLI, Functions) that also closes the aio client the run created"""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close_async_blob_service_client()
+    return asyncio.run(main())
+
+
+def ensure_container(container_name: str = None) -> None:
+    """
+    Create a container unless this process already knows it exists
+    
+    One create call the first time (an existing container is not an error),
+    no round-trip after that.
+    
+    Args:
+        container_name: Container to ensure (default: config.BLOB_CONTAINER_NAME)
+    """
+    container_name = container_name or config.BLOB_CONTAINER_NAME
+    if container_name in _ensured_containers:
+        return
+    try:
+        get_blob_service_client().create_container(container_name)
+        print(f"✓ Created container: {container_name}")
+    except ResourceExistsError:
+        pass
+    _ensured_containers.add(container_name)
+
+
+async def ensure_container_async(container_name: str = None) -> None:
+    """Async version of ensure_container"""
+    container_name = container_name or config.BLOB_CONTAINER_NAME
+    if container_name in _ensured_containers:
+        return
+    try:
+        await get_async_blob_service_client().create_container(container_name)
+        print(f"✓ Created container: {container_name}")
+    except ResourceExistsError:
+        pass
+    _ensured_containers.add(container_name)
+
+
+def forget_container(container_name: str = None) -> None:
+    """Drop the cached state of a container (e.g. after it was deleted outside this process)"""
+    _ensured_containers.discard(container_name or config.BLOB_CONTAINER_NAME)